@@ -1,14 +1,18 @@
+import hashlib
 import os
 import pickle
 import re
 import sys
 
+import numpy as np
 import psutil
 from rapidfuzz import fuzz, process
 
 from activity import utils
 from activity.classifier.heuristic_classify import HeuristicClassifier
-from data import DB
+from activity.classifier.title_index import TitleIndex
+from activity.classifier.title_store import TitleStore
+from data import open_db
 from log_utils import get_logger
 
 logger = get_logger("classifier", "classifier.log")
@@ -19,14 +23,30 @@ GAME_KEYWORDS = ["game", "steam", "crack", "repack", "gog", "epic", "valve", "la
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
 
+# Exes matched per cdist call, bounds the score matrix to chunk x len(titles)
+MATCH_CHUNK_SIZE = 32
+
+# Compiled title store, built with `python -m activity.classifier.title_store`
+TITLE_STORE_PATH = os.path.join(CURRENT_DIR, "game_titles.store")
+
+# Precomputed n-gram index, built with `python -m activity.classifier.title_index`
+TITLE_INDEX_PATH = os.path.join(CURRENT_DIR, "game_titles.index.npz")
+# Titles retrieved from the index per exe before exact WRatio rescoring
+MATCH_CANDIDATES = 50
+
 
 class GamesClassifier:
-    def __init__(self):
-        self.db = DB()
+    def __init__(self, load_index=True):
+        self.db = open_db()
 
         logger.info("Loading game titles and embeddings...")
-        # Load game titles from pickle file or dataset
-        if not os.path.exists(os.path.join(CURRENT_DIR, "game_names.pkl")):
+        self.corpus_version = None
+        # Load game titles from the compiled store, pickle file or dataset
+        if os.path.exists(TITLE_STORE_PATH):
+            logger.info("Memory-mapping compiled game title store...")
+            self.game_titles = TitleStore(TITLE_STORE_PATH)
+            self.corpus_version = self.game_titles.version
+        elif not os.path.exists(os.path.join(CURRENT_DIR, "game_names.pkl")):
             logger.info("No precomputed game names found. Loading from dataset...")
             # Set some default game titles
             self.game_titles = [
@@ -48,15 +68,35 @@ class GamesClassifier:
 
         logger.info(f"Loaded {len(self.game_titles)} game titles from dataset.")
 
+        # Title match results are memoized in the DB per corpus version
+        if self.corpus_version is None:
+            self.corpus_version = hashlib.sha1(
+                "\n".join(self.game_titles).encode("utf-8")
+            ).hexdigest()[:16]
+
+        self.title_index = self._load_title_index() if load_index else None
+
+    def _load_title_index(self):
+        if os.path.exists(TITLE_INDEX_PATH):
+            index = TitleIndex.load(TITLE_INDEX_PATH)
+            if index.corpus_version == self.corpus_version:
+                logger.info("Loaded precomputed title index.")
+                return index
+            logger.info("Precomputed title index is out of date, rebuilding in memory...")
+        else:
+            logger.info("No precomputed title index found, building in memory...")
+        return TitleIndex.build(self.game_titles, self.corpus_version)
+
     def classify(self, exes=[]):  # pylint: disable=dangerous-default-value
         if exes is None or len(exes) == 0:
             exes = utils.get_unique_windows_processes()
 
         classifier = HeuristicClassifier(exes)
 
+        # First pass: skip known exes and run the title matcher
+        candidates = []
         for exe in exes:
             try:
-                is_game = False
                 process_name = exe.name()
                 # If already in database, skip
                 already_classified = self.db.get_is_present(process_name)
@@ -65,17 +105,36 @@ class GamesClassifier:
                     logger.info(f"[SKIP] {process_name} already classified")
                     continue
 
-                result, match, score = self.is_similar_game(process_name)
-                if result == "match":
-                    logger.info(f"[MATCH ✅] {exe} → {match} (score={score})")
-                    is_game = True
-                elif result == "heuristic":
-                    logger.info(f"[HEURISTIC 🤖] {exe} might be a game (score={score})")
-                else:
-                    pass
+                candidates.append((exe, process_name))
+            except psutil.NoSuchProcess:
+                continue
+            except Exception as e:
+                logger.info(f"Error classifying {exe}: {e}")
+                import traceback  # pylint: disable=import-outside-toplevel
+
+                traceback.print_exc(file="classifier_error.log")
+                sys.exit(1)
+
+        if not candidates:
+            return
 
-                # Run heuristic classifier to be sure
-                label, heuristic_score = classifier.classify_process(exe)
+        # Match every new exe against the title corpus in one batch
+        title_matches = self.match_titles([name for _, name in candidates])
+        for exe, process_name in candidates:
+            result, match, score = title_matches[process_name]
+            if result == "match":
+                logger.info(f"[MATCH ✅] {exe} → {match} (score={score})")
+            elif result == "heuristic":
+                logger.info(f"[HEURISTIC 🤖] {exe} might be a game (score={score})")
+            else:
+                pass
+
+        # Run heuristic classifier to be sure, scoring all candidates in one pass
+        heuristic_results = classifier.classify_batch([exe for exe, _ in candidates])
+
+        for exe, process_name in candidates:
+            try:
+                label, heuristic_score = heuristic_results.get(exe.pid, ("non-game", 0.0))
                 if label == "game":
                     logger.info(
                         f"[HEURISTIC CLASSIFIER ✅] {exe} classified as game (score={heuristic_score:.2f})"
@@ -95,23 +154,76 @@ class GamesClassifier:
                 traceback.print_exc(file="classifier_error.log")
                 sys.exit(1)
 
-    def is_similar_game(self, exe_name, limit=5, score_cutoff=70):
-        exe_clean = re.sub(r"[_\-\.]", " ", exe_name.lower().replace(".exe", ""))
-        results = process.extract(
-            exe_clean,
-            self.game_titles,
-            scorer=fuzz.WRatio,  # more lenient for substring-like matches
-            limit=limit,
-            score_cutoff=score_cutoff,
-        )
-        top_match = None
-        top_score = 0.0
-
-        for match, score, _ in results:
-            if score > top_score:
-                top_match = match
-                top_score = score
+    def is_similar_game(self, exe_name, score_cutoff=70):
+        return self.match_titles([exe_name], score_cutoff=score_cutoff)[exe_name]
+
+    def match_titles(self, exe_names, score_cutoff=70):
+        """
+        Match exe names against the game title corpus.
+
+        Results are looked up in the DB memo first. The remaining names get
+        their candidate titles from the n-gram index and are rescored exactly
+        with WRatio (or scored against the whole corpus with rapidfuzz's cdist
+        when no index is loaded). New results are saved back to the memo.
 
+        Returns:
+            dict: exe_name -> (result, match, score) as returned by is_similar_game.
+        """
+        cleaned = {exe_name: self._clean_exe_name(exe_name) for exe_name in exe_names}
+        memo = self.db.get_title_matches(set(cleaned.values()), self.corpus_version)
+
+        misses = sorted(set(cleaned.values()) - memo.keys())
+        if self.title_index is not None:
+            computed = self._match_with_index(misses, score_cutoff)
+        else:
+            computed = self._match_with_cdist(misses, score_cutoff)
+
+        if computed:
+            self.db.save_title_matches(computed, self.corpus_version)
+        memo.update(computed)
+        return {exe_name: memo[exe_clean] for exe_name, exe_clean in cleaned.items()}
+
+    def _match_with_index(self, exe_cleans, score_cutoff):
+        computed = {}
+        for exe_clean in exe_cleans:
+            candidates = [
+                self.game_titles[i]
+                for i in self.title_index.top_k(exe_clean, k=MATCH_CANDIDATES)
+            ]
+            result = process.extractOne(
+                exe_clean,
+                candidates,
+                scorer=fuzz.WRatio,  # more lenient for substring-like matches
+                score_cutoff=score_cutoff,
+            )
+            top_match, top_score = (result[0], result[1]) if result else (None, 0.0)
+            computed[exe_clean] = self._decide_match(exe_clean, top_match, top_score)
+        return computed
+
+    def _match_with_cdist(self, misses, score_cutoff):
+        computed = {}
+        for i in range(0, len(misses), MATCH_CHUNK_SIZE):
+            chunk = misses[i : i + MATCH_CHUNK_SIZE]
+            scores = process.cdist(
+                chunk,
+                self.game_titles,
+                scorer=fuzz.WRatio,  # more lenient for substring-like matches
+                score_cutoff=score_cutoff,
+                workers=-1,
+            )
+            best = np.argmax(scores, axis=1)
+            for row, exe_clean in enumerate(chunk):
+                top_score = float(scores[row, best[row]])
+                top_match = self.game_titles[best[row]] if top_score > 0 else None
+                computed[exe_clean] = self._decide_match(exe_clean, top_match, top_score)
+        return computed
+
+    @staticmethod
+    def _clean_exe_name(exe_name):
+        return re.sub(r"[_\-\.]", " ", exe_name.lower().replace(".exe", ""))
+
+    @staticmethod
+    def _decide_match(exe_clean, top_match, top_score):
         if top_score >= 0.75:
             return ("match", top_match, round(top_score, 2))
 
@@ -131,7 +243,7 @@ class GamesClassifier:
         exe_name = process_name.name()
         if not exe_name:
             return False
-        return self.db.get_is_game(exe_name)
+        return exe_name in self.db.get_game_name_set()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 import time
-from typing import List
+from typing import Dict, List, Tuple
 
 import psutil
 import pythoncom
@@ -51,6 +51,57 @@ class HeuristicClassifier:
         label = "game" if score >= self.SCORE_THRESHOLD else "non-game"
         return label, score
 
+    def classify_batch(
+        self, procs: List[psutil.Process]
+    ) -> Dict[int, Tuple[str, float]]:
+        """
+        Classify many processes at once.
+
+        CPU usage is sampled over a single shared 1 second window and the GPU
+        usage map and fullscreen windows are read once for the whole batch, so
+        the cost does not grow with the number of processes.
+
+        Returns:
+            dict: pid -> (label, score), same values as classify_process.
+        """
+        results = {}
+        candidates = []
+        for proc in procs:
+            try:
+                if proc.name().lower() in self.excluded_processes:
+                    results[proc.pid] = ("non-game", 0.0)
+                    continue
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                results[proc.pid] = ("non-game", 0.0)
+                continue
+            candidates.append(proc)
+
+        if not candidates:
+            return results
+
+        # One CPU baseline for every candidate, then a single sleep
+        for proc in candidates:
+            try:
+                proc.cpu_percent(interval=None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        time.sleep(1)
+
+        gpu_usage_map = self._get_gpu_usage_percent()
+        fullscreen_pids = self._get_fullscreen_pids()
+
+        for proc in candidates:
+            try:
+                cpu = proc.cpu_percent(interval=None)
+                score = self._score_metrics(
+                    proc, cpu, gpu_usage_map, proc.pid in fullscreen_pids
+                )
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                score = 0.0
+            label = "game" if score >= self.SCORE_THRESHOLD else "non-game"
+            results[proc.pid] = (label, score)
+        return results
+
     def _heuristic_process_score(self, proc: psutil.Process):
         try:
             gpu_usage_map = self._get_gpu_usage_percent()
@@ -60,42 +111,46 @@ class HeuristicClassifier:
             _ = proc.cpu_percent(interval=None)  # Initial call to get a baseline
             time.sleep(1)  # Sleep to allow CPU usage to be calculated
             cpu = proc.cpu_percent(interval=None)  # Get CPU usage after sleep
-            # Get the maximum CPU usage across all cores
-            cpu = max(cpu) if isinstance(cpu, list) else cpu
-            # If greater than 100, it means the process is using multiple cores
-            if cpu > 100:
-                cpu = cpu / psutil.cpu_count()
-            gpu = gpu_usage_map.get(proc.pid, 0.0)  # Get GPU usage for this process
-            mem = proc.memory_info().rss / (1024 * 1024)  # in MB
-            exe = proc.exe().lower()
-            pid = proc.pid
-            score = 0
-
-            if cpu > 15:
-                score += 1.5
-            elif cpu > 5:
-                score += 0.5
-
-            # Keeping single value for GPU for now
-            if gpu > 50:
-                score += 1.5
-
-            if mem > 700:
-                score += 1.5
-            elif mem > 300:
-                score += 0.5
-
-            if "games" in exe or "steamapps" in exe or "epic" in exe:
-                score += 1.0
-
-            if self._check_fullscreen(pid):
-                score += 1.0
-
-            return score
+            return self._score_metrics(
+                proc, cpu, gpu_usage_map, self._check_fullscreen(proc.pid)
+            )
 
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             return 0.0
 
+    def _score_metrics(self, proc: psutil.Process, cpu, gpu_usage_map, is_fullscreen):
+        # Get the maximum CPU usage across all cores
+        cpu = max(cpu) if isinstance(cpu, list) else cpu
+        # If greater than 100, it means the process is using multiple cores
+        if cpu > 100:
+            cpu = cpu / psutil.cpu_count()
+        gpu = gpu_usage_map.get(proc.pid, 0.0)  # Get GPU usage for this process
+        mem = proc.memory_info().rss / (1024 * 1024)  # in MB
+        exe = proc.exe().lower()
+        score = 0
+
+        if cpu > 15:
+            score += 1.5
+        elif cpu > 5:
+            score += 0.5
+
+        # Keeping single value for GPU for now
+        if gpu > 50:
+            score += 1.5
+
+        if mem > 700:
+            score += 1.5
+        elif mem > 300:
+            score += 0.5
+
+        if "games" in exe or "steamapps" in exe or "epic" in exe:
+            score += 1.0
+
+        if is_fullscreen:
+            score += 1.0
+
+        return score
+
     def _get_gpu_usage_percent(self):
         try:
             pythoncom.CoInitialize()  # pylint: disable=no-member
@@ -122,14 +177,24 @@ class HeuristicClassifier:
                 return True
         return False
 
-    def _is_fullscreen(self, hwnd):
+    def _get_fullscreen_pids(self):
+        """Enumerate top-level windows and monitors once, return pids owning a fullscreen window."""
+        monitors = get_monitors()
+        fullscreen_pids = set()
+        for hwnd in self._get_top_windows():
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            if pid not in fullscreen_pids and self._is_fullscreen(hwnd, monitors):
+                fullscreen_pids.add(pid)
+        return fullscreen_pids
+
+    def _is_fullscreen(self, hwnd, monitors=None):
         if not win32gui.IsWindowVisible(hwnd):
             return False
         rect = win32gui.GetWindowRect(hwnd)
         width = rect[2] - rect[0]
         height = rect[3] - rect[1]
 
-        for m in get_monitors():
+        for m in monitors if monitors is not None else get_monitors():
             if abs(width - m.width) < 50 and abs(height - m.height) < 50:
                 return True
         return False
@@ -0,0 +1,146 @@
+import math
+import re
+import zlib
+from typing import List, Sequence
+
+import numpy as np
+
+from log_utils import get_logger
+
+logger = get_logger("title_index", "classifier.log")
+
+NGRAM_SIZE = 3
+NUM_FEATURES = 1 << 18  # Hashed n-gram buckets
+MAX_DF_RATIO = 0.2  # Skip n-grams present in more titles than this at query time
+
+
+def _normalize(text: str) -> str:
+    return " " + re.sub(r"[^0-9a-z]+", " ", text.lower()).strip() + " "
+
+
+def _features(text: str):
+    """Return {hashed char n-gram: count} for a piece of text."""
+    text = _normalize(text)
+    counts = {}
+    for i in range(len(text) - NGRAM_SIZE + 1):
+        feature = zlib.crc32(text[i : i + NGRAM_SIZE].encode("utf-8")) & (
+            NUM_FEATURES - 1
+        )
+        counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+
+class TitleIndex:
+    """
+    TF-IDF index over character n-grams of the game title corpus.
+
+    Stored as an inverted index in flat NumPy arrays: for every hashed n-gram,
+    `postings_ptr` points at the slice of `postings_doc`/`postings_weight`
+    holding the titles that contain it. A lookup only touches the posting
+    lists of the query's n-grams, so it stays cheap on a large corpus and only
+    the returned candidates need an exact WRatio rescoring.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self, postings_ptr, postings_doc, postings_weight, idf, num_titles, corpus_version
+    ):
+        self.postings_ptr = postings_ptr
+        self.postings_doc = postings_doc
+        self.postings_weight = postings_weight
+        self.idf = idf
+        self.num_titles = num_titles
+        self.corpus_version = corpus_version
+        self._max_df = max(1, int(self.num_titles * MAX_DF_RATIO))
+
+    @classmethod
+    def build(cls, titles: Sequence[str], corpus_version: str = "") -> "TitleIndex":
+        docs, feats, counts = [], [], []
+        for doc_id, title in enumerate(titles):
+            for feature, count in _features(title).items():
+                docs.append(doc_id)
+                feats.append(feature)
+                counts.append(count)
+
+        docs = np.asarray(docs, dtype=np.int32)
+        feats = np.asarray(feats, dtype=np.int32)
+        tf = 1.0 + np.log(np.asarray(counts, dtype=np.float32))
+
+        df = np.bincount(feats, minlength=NUM_FEATURES)
+        idf = np.log((1.0 + len(titles)) / (1.0 + df)).astype(np.float32) + 1.0
+        weights = tf * idf[feats]
+
+        # L2-normalize each title vector
+        norms = np.sqrt(np.bincount(docs, weights=weights * weights, minlength=len(titles)))
+        weights = (weights / np.maximum(norms[docs], 1e-9)).astype(np.float32)
+
+        order = np.argsort(feats, kind="stable")
+        postings_ptr = np.zeros(NUM_FEATURES + 1, dtype=np.int64)
+        np.cumsum(df, out=postings_ptr[1:])
+        return cls(
+            postings_ptr, docs[order], weights[order], idf, len(titles), corpus_version
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "TitleIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["postings_ptr"],
+                data["postings_doc"],
+                data["postings_weight"],
+                data["idf"],
+                int(data["num_titles"]),
+                str(data["corpus_version"]),
+            )
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                postings_ptr=self.postings_ptr,
+                postings_doc=self.postings_doc,
+                postings_weight=self.postings_weight,
+                idf=self.idf,
+                num_titles=np.array(self.num_titles),
+                corpus_version=np.array(self.corpus_version),
+            )
+
+    def top_k(self, query: str, k: int = 50) -> List[int]:
+        """Return the ids of the k titles most similar to the query."""
+        features = _features(query)
+        if not features or self.num_titles == 0:
+            return []
+
+        query_weights = {
+            feature: (1.0 + math.log(count)) * float(self.idf[feature])
+            for feature, count in features.items()
+        }
+        norm = math.sqrt(sum(w * w for w in query_weights.values())) or 1.0
+
+        scores = np.zeros(self.num_titles, dtype=np.float32)
+        for feature, weight in query_weights.items():
+            start, end = self.postings_ptr[feature], self.postings_ptr[feature + 1]
+            if start == end or end - start > self._max_df:
+                continue
+            # A title appears at most once per posting list, so plain fancy
+            # indexing is safe here
+            scores[self.postings_doc[start:end]] += (
+                weight / norm
+            ) * self.postings_weight[start:end]
+
+        k = min(k, self.num_titles)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[scores[top] > 0]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+if __name__ == "__main__":
+    # Build the index offline: python -m activity.classifier.title_index
+    from activity.classifier.game_classifier import (  # pylint: disable=import-outside-toplevel
+        TITLE_INDEX_PATH,
+        GamesClassifier,
+    )
+
+    classifier = GamesClassifier(load_index=False)
+    index = TitleIndex.build(classifier.game_titles, classifier.corpus_version)
+    index.save(TITLE_INDEX_PATH)
+    logger.info(f"Wrote title index for {index.num_titles} titles to {TITLE_INDEX_PATH}")
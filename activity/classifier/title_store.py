@@ -0,0 +1,179 @@
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import re
+import struct
+import tempfile
+import unicodedata
+from array import array
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from log_utils import get_logger
+
+logger = get_logger("title_store", "classifier.log")
+
+# File layout:
+#   header  : magic (8s) | title count (Q) | blob offset (Q) | corpus version (16s)
+#   offsets : (count + 1) little-endian uint64, start of every title in the blob
+#   blob    : the UTF-8 encoded titles back to back
+MAGIC = b"FLTITLE1"
+HEADER = struct.Struct("<8sQQ16s")
+
+
+def normalize_title(title: str) -> str:
+    title = unicodedata.normalize("NFKC", title)
+    return re.sub(r"\s+", " ", title).strip()
+
+
+def iter_source_titles(path: str) -> Iterator[str]:
+    """
+    Stream raw titles from a dataset file without loading it whole.
+    Supports CSV (a `name` or `title` column, else the first column), JSON Lines,
+    a JSON array of strings/objects and a pickled list.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            lowered = [col.strip().lower() for col in header]
+            column = next((lowered.index(c) for c in ("name", "title") if c in lowered), None)
+            if column is None:
+                # No known header, the first row is data
+                column = 0
+                if header:
+                    yield header[0]
+            for row in reader:
+                if len(row) > column:
+                    yield row[column]
+    elif ext in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield _title_from_json(json.loads(line))
+    elif ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            for item in json.load(f):
+                yield _title_from_json(item)
+    elif ext == ".pkl":
+        with open(path, "rb") as f:
+            yield from pickle.load(f)
+    else:
+        raise ValueError(f"Unsupported title dataset format: {path}")
+
+
+def _title_from_json(item) -> str:
+    if isinstance(item, dict):
+        return item.get("name") or item.get("title") or ""
+    return str(item)
+
+
+def build_title_store(titles: Iterable[str], dest: str) -> int:
+    """
+    Compile titles into a normalized, deduplicated, offset indexed store file.
+    Titles are streamed to a temporary blob, only the offsets and the dedupe keys
+    are kept in memory. Returns the number of titles written.
+    """
+    seen = set()
+    offsets = array("Q", [0])
+    digest = hashlib.sha1()
+    dest_dir = os.path.dirname(os.path.abspath(dest))
+
+    with tempfile.TemporaryFile(dir=dest_dir) as blob:
+        for title in titles:
+            title = normalize_title(title or "")
+            key = title.casefold()
+            if not title or key in seen:
+                continue
+            seen.add(key)
+            encoded = title.encode("utf-8")
+            blob.write(encoded)
+            digest.update(encoded + b"\n")
+            offsets.append(offsets[-1] + len(encoded))
+
+        count = len(offsets) - 1
+        blob_offset = HEADER.size + offsets.itemsize * len(offsets)
+        version = digest.hexdigest()[:16].encode("ascii")
+
+        tmp_dest = dest + ".tmp"
+        with open(tmp_dest, "wb") as out:
+            out.write(HEADER.pack(MAGIC, count, blob_offset, version))
+            out.write(np.asarray(offsets, dtype="<u8").tobytes())
+            blob.seek(0)
+            while chunk := blob.read(1 << 20):
+                out.write(chunk)
+        os.replace(tmp_dest, dest)
+
+    logger.info(f"Wrote {count} titles to {dest}")
+    return count
+
+
+class TitleStore:
+    """
+    Read-only, memory-mapped view of a compiled title store.
+
+    Opening it only maps the file, titles are decoded on access. The mapping is
+    backed by the OS page cache, so every process using the store shares the
+    same physical memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, blob_offset, version = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a title store")
+        self.version = version.decode("ascii")
+        self._blob_offset = blob_offset
+        self._offsets = np.frombuffer(
+            self._mmap, dtype="<u8", count=count + 1, offset=HEADER.size
+        )
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("title index out of range")
+        start = self._blob_offset + int(self._offsets[i])
+        end = self._blob_offset + int(self._offsets[i + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+
+if __name__ == "__main__":
+    # Compile a dataset: python -m activity.classifier.title_store [sources...] [-o out]
+    from activity.classifier.game_classifier import (  # pylint: disable=import-outside-toplevel
+        CURRENT_DIR,
+        TITLE_STORE_PATH,
+    )
+
+    parser = argparse.ArgumentParser(description="Compile game titles into a title store.")
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        default=[os.path.join(CURRENT_DIR, "game_names.pkl")],
+        help="CSV, JSON, JSON Lines or pickle files with game titles",
+    )
+    parser.add_argument("-o", "--output", default=TITLE_STORE_PATH)
+    args = parser.parse_args()
+
+    build_title_store(
+        (title for source in args.sources for title in iter_source_titles(source)),
+        args.output,
+    )
@@ -0,0 +1,89 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class LiveEventHub:
+    """
+    In-process fan-out of tracker state changes to dashboard subscribers.
+
+    The tracker publishes the set of running games and the seconds it just
+    added per game. The hub turns that into events only when something
+    changed and keeps the last HISTORY events, so any number of subscribers
+    (one per open dashboard tab) wait on the same condition and read the same
+    history instead of sampling processes themselves.
+    """
+
+    HISTORY = 256
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=self.HISTORY)  # (version, name, data)
+        self._version = 0
+        self._running = frozenset()
+        self._day = None
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def running(self):
+        return self._running
+
+    @contextmanager
+    def updating(self):
+        """
+        Hold off snapshots while the caller changes the state they are built
+        from and publishes the matching events. Otherwise a snapshot could
+        count seconds whose 'timings' event is still to come.
+        """
+        with self._condition:
+            yield
+
+    def snapshot(self, build):
+        """Return (version, build()) with no events published in between."""
+        with self._condition:
+            return self._version, build()
+
+    def publish(self, running_games, deltas, day):
+        """
+        Record one tracker tick. `deltas` maps exe names to the seconds added
+        for `day` during the tick.
+        """
+        running_games = frozenset(running_games)
+        with self._condition:
+            changed = False
+            if self._day is not None and day != self._day:
+                self._append("day", {"day": day})
+                changed = True
+            self._day = day
+            if running_games != self._running:
+                self._running = running_games
+                self._append("running", {"running": sorted(running_games)})
+                changed = True
+            deltas = {exe_name: seconds for exe_name, seconds in deltas.items() if seconds}
+            if deltas:
+                self._append("timings", {"deltas": deltas})
+                changed = True
+            if changed:
+                self._condition.notify_all()
+
+    def _append(self, name, data):
+        self._version += 1
+        self._events.append((self._version, name, data))
+
+    def wait_for_events(self, after_version, timeout=None):
+        """
+        Wait for events newer than after_version.
+        Returns (version, events) with events as (version, name, data) tuples,
+        (version, None) if the subscriber fell behind the history and has to
+        resync, or None on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._version > after_version, timeout):
+                return None
+            if not self._events or self._events[0][0] > after_version + 1:
+                return self._version, None
+            events = [event for event in self._events if event[0] > after_version]
+            return self._version, events
@@ -0,0 +1,257 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+from log_utils import get_logger
+
+logger = get_logger("process_snapshot", "tracker.log")
+
+
+class ProcessEntry:
+    """
+    A process seen by the ProcessTable. Attributes are read once, when the pid
+    first shows up, so consumers never have to call back into psutil for them.
+    `name` or `exe` is None when we are not allowed to read it.
+    """
+
+    __slots__ = ("pid", "create_time", "name", "exe", "process")
+
+    def __init__(self, process: psutil.Process, create_time, name, exe):
+        self.pid = process.pid
+        self.create_time = create_time
+        self.name = name
+        self.exe = exe
+        self.process = process
+
+    @property
+    def key(self) -> Tuple[int, float]:
+        return (self.pid, self.create_time)
+
+
+class ProcessTable:
+    """
+    Persistent pid-keyed process table.
+
+    Each refresh only diffs the pid list against what is already known, fetches
+    attributes for new pids (batched with psutil's oneshot()) and reports which
+    processes started and exited. Entries are identified by (pid, create_time)
+    and surviving pids are revalidated every REVALIDATE_EVERY refreshes so a
+    reused pid is reported as exited + started.
+    """
+
+    REVALIDATE_EVERY = 30
+
+    def __init__(self):
+        self._entries: Dict[int, ProcessEntry] = {}
+        self._refresh_count = 0
+
+    @property
+    def entries(self) -> Dict[int, ProcessEntry]:
+        return self._entries
+
+    def refresh(self) -> Tuple[List[ProcessEntry], List[ProcessEntry]]:
+        current_pids = set(psutil.pids())
+        exited = [
+            self._entries.pop(pid) for pid in self._entries.keys() - current_pids
+        ]
+
+        self._refresh_count += 1
+        if self._refresh_count % self.REVALIDATE_EVERY == 0:
+            for pid, entry in list(self._entries.items()):
+                if not entry.process.is_running():
+                    exited.append(self._entries.pop(pid))
+
+        started = []
+        for pid in current_pids - self._entries.keys():
+            entry = self._load(pid)
+            if entry is not None:
+                self._entries[pid] = entry
+                started.append(entry)
+        return started, exited
+
+    @staticmethod
+    def _load(pid: int) -> Optional[ProcessEntry]:
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                create_time = proc.create_time()
+                name = ProcessTable._read(proc.name)
+                exe = ProcessTable._read(proc.exe)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+        return ProcessEntry(proc, create_time, name, exe)
+
+    @staticmethod
+    def _read(getter):
+        try:
+            return getter()
+        except psutil.AccessDenied:
+            return None
+
+
+class ProcessSnapshot:
+    """
+    Immutable view of the process table taken at a single point in time.
+
+    `unique_entries` keeps the old `get_unique_windows_processes` semantics (one
+    accessible process per executable path), `entries_by_name` and
+    `pids_by_name` cover every named process so consumers can kill or look up
+    all instances of an exe.
+    `started` and `exited` hold the process events since the previous snapshot.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        taken_at: float,
+        entries: Dict[int, ProcessEntry],
+        started: List[ProcessEntry],
+        exited: List[ProcessEntry],
+    ):
+        self.version = version
+        self.taken_at = taken_at
+        self.started = started
+        self.exited = exited
+
+        unique = {}
+        entries_by_name = {}
+        for entry in entries.values():
+            if not entry.name:
+                continue
+            entries_by_name.setdefault(entry.name, []).append(entry)
+            if entry.exe and entry.exe not in unique:
+                unique[entry.exe] = entry
+        self.unique_entries = list(unique.values())
+        self.entries_by_name = entries_by_name
+        self.pids_by_name = {
+            name: [entry.pid for entry in named] for name, named in entries_by_name.items()
+        }
+        self.names = frozenset(entries_by_name)
+
+    @property
+    def processes(self) -> List[psutil.Process]:
+        return [entry.process for entry in self.unique_entries]
+
+    def is_running(self, exe_name: str) -> bool:
+        return exe_name in self.names
+
+
+class ProcessSnapshotService:
+    """
+    Samples the process table once per interval and publishes the result.
+
+    Every tracker loop (and the dashboard) reads the latest snapshot instead of
+    walking psutil.process_iter on its own.
+    """
+
+    HISTORY_SIZE = 32
+    STALE_AFTER = 3  # intervals after which the latest snapshot is no longer trusted
+
+    def __init__(self, interval: float = 2):
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self._condition = threading.Condition()
+        self._table = ProcessTable()
+        self._snapshot: Optional[ProcessSnapshot] = None
+        self._history = deque(maxlen=self.HISTORY_SIZE)
+        self._version = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def refresh(self) -> ProcessSnapshot:
+        """Take a snapshot right now and publish it to all consumers."""
+        with self._condition:
+            started, exited = self._table.refresh()
+            snapshot = ProcessSnapshot(
+                self._version + 1, time.time(), self._table.entries, started, exited
+            )
+            self._version = snapshot.version
+            self._snapshot = snapshot
+            self._history.append(snapshot)
+            self._condition.notify_all()
+        return snapshot
+
+    def latest(self) -> Optional[ProcessSnapshot]:
+        return self._snapshot
+
+    def fresh(self, max_age: Optional[float] = None) -> Optional[ProcessSnapshot]:
+        """
+        Latest snapshot if it is at most `max_age` seconds old (STALE_AFTER
+        intervals by default). Returns None when sampling has not started or
+        has stalled, so callers can fall back to scanning themselves.
+        """
+        snapshot = self._snapshot
+        if max_age is None:
+            max_age = self.interval * self.STALE_AFTER
+        if snapshot is None or time.time() - snapshot.taken_at > max_age:
+            return None
+        return snapshot
+
+    def wait_for_snapshot(
+        self, after_version: int = 0, timeout: Optional[float] = None
+    ) -> Optional[ProcessSnapshot]:
+        """
+        Block until a snapshot newer than `after_version` is published.
+        Returns None if the timeout expires or the service is stopped.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._version > after_version or self.stop_event.is_set(),
+                timeout=timeout,
+            )
+            if self._version > after_version:
+                return self._snapshot
+            return None
+
+    def wait_for_changes(
+        self, after_version: int, timeout: Optional[float] = None
+    ) -> Optional[Tuple[ProcessSnapshot, Optional[Tuple[List[ProcessEntry], List[ProcessEntry]]]]]:
+        """
+        wait_for_snapshot() and events_since() in one go. Both run under the
+        same lock, so the events end exactly at the returned snapshot. Returns
+        (snapshot, events), or None if the timeout expires or the service is
+        stopped.
+        """
+        with self._condition:  # Reentrant, the calls below take it again
+            snapshot = self.wait_for_snapshot(after_version, timeout)
+            if snapshot is None:
+                return None
+            return snapshot, self.events_since(after_version)
+
+    def events_since(
+        self, after_version: int
+    ) -> Optional[Tuple[List[ProcessEntry], List[ProcessEntry]]]:
+        """
+        Collect the started/exited events published after `after_version`.
+        Returns None when the history no longer reaches back that far, in which
+        case the caller has to resync from the latest snapshot.
+        """
+        with self._condition:
+            snapshots = [s for s in self._history if s.version > after_version]
+            if not snapshots or snapshots[0].version != after_version + 1:
+                return None if after_version < self._version else ([], [])
+            started, exited = [], []
+            for snapshot in snapshots:
+                started.extend(snapshot.started)
+                exited.extend(snapshot.exited)
+            return started, exited
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error taking process snapshot: {e}")
+
+    def start(self):
+        self.refresh()
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
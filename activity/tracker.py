@@ -7,9 +7,13 @@ from typing import List
 
 import psutil
 
-from activity import utils
 from activity.classifier.game_classifier import GamesClassifier
-from data import DB
+from activity.live_events import LiveEventHub
+from activity.process_snapshot import ProcessEntry, ProcessSnapshotService
+from activity.violation_engine import ViolationEngine
+from data import Compactor, TimingAccumulator, open_db
+from data.backup import BackupJob
+from data.days import day_key, next_day_start, split_by_day
 from log_utils import get_logger
 
 logger = get_logger("tracker", "tracker.log")
@@ -19,11 +23,31 @@ class Tracker:
     SLEEP_TIME = 2
     CLASSIFY_INTERVAL = 60  # seconds
     VIOLATION_COUNT_LIMIT = 3
+    ROLLOVER_CHECK_INTERVAL = 60  # seconds, longest sleep before re-reading the clock
 
     def __init__(self):
         self.classifier = GamesClassifier()
-        self.db = DB()
+        self.db = open_db()
+        # Buffers timing updates and writes them in batches
+        self.timings = TimingAccumulator(self.db)
+        # Schedules warnings/kills for the moment a running game hits its limit
+        self.violations = ViolationEngine(
+            self.db,
+            on_warning=self._notify_user_for_violation,
+            on_kill=self._kill_game,
+            violation_count_limit=self.VIOLATION_COUNT_LIMIT,
+        )
+        # Moves history past the retention horizon into compressed archives
+        self.compactor = Compactor(self.db)
+        # Periodic online snapshots of the DB
+        self.backups = BackupJob(self.db)
         self.stop_event = threading.Event()
+        # Single sampler of the process table shared by every loop below
+        self.process_snapshots = ProcessSnapshotService(interval=self.SLEEP_TIME)
+        # Running games and timing deltas pushed to the dashboard's live stream
+        self.live_events = LiveEventHub()
+        # Game -> Popen of its open message box, so escalation does not stack them
+        self._message_boxes = {}
 
         # Initialize set with already classified exe names
         self.seen_process_names = set(self.db.get_all_classified_processes())
@@ -37,27 +61,37 @@ class Tracker:
         self.violation_handler_thread = threading.Thread(
             target=self.check_and_handle_timing_violations, daemon=True
         )
+        self.rollover_thread = threading.Thread(
+            target=self.run_day_rollover, daemon=True
+        )
+        self.compaction_thread = threading.Thread(
+            target=self.compactor.run, args=(self.stop_event,), daemon=True
+        )
+        self.backup_thread = threading.Thread(
+            target=self.backups.run, args=(self.stop_event,), daemon=True
+        )
 
     def classify_new_processes(self):
         while not self.stop_event.is_set():
             try:
-                exes = utils.get_unique_windows_processes()
-                new_exes = [
-                    exe for exe in exes if exe.name() not in self.seen_process_names
+                snapshot = self.process_snapshots.latest()
+                entries = snapshot.unique_entries if snapshot else []
+                new_entries = [
+                    entry for entry in entries if entry.name not in self.seen_process_names
                 ]
 
-                if new_exes:
+                if new_entries:
                     self.classifier.classify(
-                        exes=new_exes
+                        exes=[entry.process for entry in new_entries]
                     )  # This should save classification results to DB
-                    for exe in new_exes:
-                        self.seen_process_names.add(exe.name())
+                    for entry in new_entries:
+                        self.seen_process_names.add(entry.name)
 
                     logger.info(
-                        f"[{datetime.now()}] Classified {len(new_exes)} new processes."
+                        f"[{datetime.now()}] Classified {len(new_entries)} new processes."
                     )
 
-                time.sleep(self.CLASSIFY_INTERVAL)
+                self.stop_event.wait(self.CLASSIFY_INTERVAL)
             except Exception as e:
                 logger.error(f"Error classifying new processes: {e}")
                 import traceback  # pylint: disable=import-outside-toplevel
@@ -65,27 +99,55 @@ class Tracker:
                 traceback.print_exc(file="tracker_error.log")
 
     def update_game_timings(self):
-        game_process_cache = {}  # pid -> (name, create_time)
+        game_process_cache = {}  # pid -> (name, create_time, session_id)
         previous_tick = time.time()
+        last_version = 0
 
         while not self.stop_event.is_set():
             try:
-                self._handle_first_run_today()  # Ensure DB is populated
-
-                exes = utils.get_unique_windows_processes()
-                updated_games = self._get_updated_games(exes, game_process_cache, previous_tick)
-
-                for name, duration in updated_games.items():
-                    self.db.update_timing_by_duration(name, duration)
+                changes = self.process_snapshots.wait_for_changes(
+                    last_version, timeout=self.SLEEP_TIME * 2
+                )
+                if changes is None:
+                    continue
+                snapshot, events = changes
+                last_version = snapshot.version
+
+                # Cleanup: drop exited PIDs, resync if we fell too far behind
+                if events is None:
+                    for pid, data in list(game_process_cache.items()):
+                        if pid not in snapshot.pids_by_name.get(data[0], ()):
+                            self._end_session(game_process_cache.pop(pid))
+                else:
+                    for entry in events[1]:
+                        data = game_process_cache.get(entry.pid)
+                        if data is not None and data[1] == entry.create_time:
+                            self._end_session(game_process_cache.pop(entry.pid))
+
+                # Set intersection against the in-memory game index, no DB lookups
+                running_games = snapshot.names & self.db.get_game_name_set()
+                game_entries = [
+                    entry for entry in snapshot.unique_entries if entry.name in running_games
+                ] if running_games else []
+                live_deltas = {}  # Seconds added today per game, backfills included
+                updated_games = self._get_updated_games(
+                    game_entries, game_process_cache, previous_tick, live_deltas
+                )
 
-                # Cleanup: remove dead PIDs
-                live_pids = {exe.pid for exe in exes}
-                game_process_cache = {
-                    pid: data for pid, data in game_process_cache.items() if pid in live_pids
-                }
+                today = day_key()
+                for (name, day), duration in updated_games.items():
+                    if day == today:
+                        live_deltas[name] = live_deltas.get(name, 0) + duration
+                # Buffer and publish together, stream snapshots see both or neither
+                with self.live_events.updating():
+                    for (name, day), duration in sorted(
+                        updated_games.items(), key=lambda i: i[0][1]
+                    ):
+                        self.timings.add(name, duration, day=day)
+                    self.live_events.publish(running_games, live_deltas, today)
+                self.violations.update_running(running_games)
 
                 previous_tick = time.time()
-                time.sleep(self.SLEEP_TIME)
 
             except Exception as e:
                 logger.error(f"[{datetime.now()}] Error updating game timings: {e}")
@@ -93,115 +155,123 @@ class Tracker:
                 traceback.print_exc(file="tracker_error.log")
                 break
 
-    def _get_updated_games(self, exes, game_process_cache, previous_tick):
+    def _get_updated_games(self, entries, game_process_cache, previous_tick, backfilled=None):
+        """
+        Return {(exe_name, day): seconds} played since the previous tick. A tick
+        that crosses the day boundary is split between both days. Seconds
+        backfilled for games that were already running are added to `backfilled`.
+        """
         updated_games = defaultdict(int)
         current_tick = time.time()
+        tick_by_day = self._split_tick(previous_tick, current_tick)
 
-        for exe in exes:
-            try:
-                pid = exe.pid
-                name = exe.name()
-                create_time = exe.create_time()
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-            try:
-                if not self.classifier.is_game(exe):
-                    continue
-            except Exception:
-                continue
-
+        for entry in entries:
+            pid = entry.pid
+            name = entry.name
             now = time.time()
 
-            if pid not in game_process_cache:
-                game_process_cache[pid] = (name, create_time)
+            cached = game_process_cache.get(pid)
+            if cached is None or cached[:2] != (name, entry.create_time):
+                if cached is not None:
+                    self._end_session(cached)  # PID was reused by another process
 
                 existing_time = self.db.get_timing_for_exe(name)
-                if existing_time is None or existing_time == 0:
-                    backfilled_duration = int(now - create_time)
+                backfill = existing_time is None or existing_time == 0
+                session_start = entry.create_time if backfill else previous_tick
+                session_id = self.db.open_session(name, pid, session_start)
+                game_process_cache[pid] = (name, entry.create_time, session_id)
+
+                if backfill:
+                    # Only the part of the run that falls on today counts for today
+                    backfilled_duration = int(
+                        split_by_day(entry.create_time, now).get(day_key(), 0)
+                    )
                     self.db.update_timing_to_a_specific_value(name, backfilled_duration)
+                    if backfilled is not None:
+                        backfilled[name] = backfilled.get(name, 0) + backfilled_duration
                     continue
 
-            updated_time = int(current_tick - previous_tick)
-            if updated_time > 0:
-                updated_games[name] += updated_time
+            for day, updated_time in tick_by_day.items():
+                updated_games[(name, day)] += updated_time
 
         return updated_games
 
+    @staticmethod
+    def _split_tick(previous_tick, current_tick):
+        """Whole seconds of a tick per day, adding up to int(current - previous)."""
+        total = int(current_tick - previous_tick)
+        if total <= 0:
+            return {}
+        seconds_by_day = split_by_day(previous_tick, previous_tick + total)
+        if len(seconds_by_day) == 1:
+            return {day: total for day in seconds_by_day}
+        days = sorted(seconds_by_day)
+        split = {day: int(seconds_by_day[day]) for day in days[:-1]}
+        split[days[-1]] = total - sum(split.values())
+        return {day: seconds for day, seconds in split.items() if seconds > 0}
+
+    def _end_session(self, cached):
+        _, _, session_id = cached
+        try:
+            self.db.close_session(session_id, time.time())
+        except Exception as e:
+            logger.error(f"Could not close session {session_id}: {e}")
 
     def check_if_processes_running(self, exe_names: List[str]) -> List[str]:
-        running_exes = []
-        for process in psutil.process_iter(["name"]):
-            if process.info["name"] in exe_names:
-                running_exes.append(process.info["name"])
-        return running_exes
+        snapshot = self.process_snapshots.latest()
+        if snapshot is None:
+            return []
+        return [exe_name for exe_name in exe_names if snapshot.is_running(exe_name)]
 
     def check_and_handle_timing_violations(self):
         """
-        Check if any game has exceeded its time limit and handle notifications.
-        This method should be called periodically, every 5 seconds or so, to check for timing violations.
+        Run the violation engine until the tracker stops.
+        Warnings and kills fire when a running game reaches its time limit, the
+        timing loop keeps the engine informed about which games are running.
         """
-        while not self.stop_event.is_set():
-            try:
-                # Get current running process names
-                running_processes = utils.get_unique_windows_processes()
-                running_exe_names = set(
-                    proc.name() for proc in running_processes if proc.name()
-                )
-                violations = self.db.get_games_with_time_violations(
-                    running_processes=running_exe_names
-                )
+        self.violations.run(self.stop_event)
 
-                # If the game is running, we can notify the user
-                if violations:
-                    running_games = self.check_if_processes_running(
-                        [v[0] for v in violations]
-                    )
-                    for game, max_time, _ in violations:
-                        if game in running_games:
-                            current_time = self.db.get_timing_for_exe(game)
-                            violation_count = self.db.get_violation_count_for_exe(game)
-
-                            if (
-                                current_time >= max_time
-                                and violation_count < self.VIOLATION_COUNT_LIMIT
-                            ):
-                                self._notify_user_for_violation(game, max_time)
-                            elif violation_count >= self.VIOLATION_COUNT_LIMIT:
-                                # Kill the process if it has exceeded the violation limit
-                                for proc in psutil.process_iter(["name"]):
-                                    if proc.info["name"] == game:
-                                        logger.warning(
-                                            f"Killing process {game} for exceeding violation limit."
-                                        )
-                                        proc.kill()
-                                self._notify_user_for_process_kill(game)
+    def _kill_game(self, game: str):
+        snapshot = self.process_snapshots.latest()
+        if snapshot is not None:
+            self._kill_processes(snapshot.entries_by_name.get(game, []), game)
+        self._notify_user_for_process_kill(game)
 
-            except Exception as e:
-                logger.error(f"Error checking timing violations: {e}")
-                import traceback  # pylint: disable=import-outside-toplevel
-
-                traceback.print_exc(file="tracker_error.log")
-            time.sleep(10)  # Check every 10 seconds
+    def _kill_processes(self, entries: List[ProcessEntry], game: str):
+        for entry in entries:
+            try:
+                # The snapshot can be a tick old. is_running() compares the pid's
+                # create_time with the snapshot's, so a game that exited and had
+                # its pid reused is skipped instead of killing an unrelated process.
+                if not entry.process.is_running():
+                    continue
+                logger.warning(f"Killing process {game} for exceeding violation limit.")
+                entry.process.kill()
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+                logger.error(f"Could not kill {game} (pid {entry.pid}): {e}")
 
     def _notify_user_for_process_kill(self, game_name: str):
         message = f"{game_name} has been running for too long, it was killed."
-        subprocess.run(
-            [
-                "powershell.exe",
-                "-Command",
-                f"[System.Reflection.Assembly]::LoadWithPartialName('System.Windows.Forms') | Out-Null; "
-                f"[System.Windows.Forms.MessageBox]::Show("
-                f'"{message}", "Game Tracker Alert", '
-                f"[System.Windows.Forms.MessageBoxButtons]::OK, "
-                f"[System.Windows.Forms.MessageBoxIcon]::Error)",
-            ],
-            check=False
-        )
+        self._show_message_box(game_name, message, "Error", replace=True)
 
     def _notify_user_for_violation(self, game_name: str, max_time: int):
         message = f"{game_name} has exceeded the time limit! Please stop playing. Max time: {max_time}"
-        subprocess.run(
+        self._show_message_box(game_name, message, "Warning")
+
+    def _show_message_box(self, game_name: str, message: str, icon: str, replace=False):
+        """
+        Show at most one message box per game. Warnings repeat every escalation
+        step, they are skipped while the previous box is still open. With
+        `replace` the open box is closed first (the kill notice replaces the
+        warning).
+        """
+        box = self._message_boxes.get(game_name)
+        if box is not None and box.poll() is None:
+            if not replace:
+                return
+            box.terminate()
+        # Popen so the message box does not block the violation engine
+        self._message_boxes[game_name] = subprocess.Popen(  # pylint: disable=consider-using-with
             [
                 "powershell.exe",
                 "-Command",
@@ -209,11 +279,34 @@ class Tracker:
                 f"[System.Windows.Forms.MessageBox]::Show("
                 f'"{message}", "Game Tracker Alert", '
                 f"[System.Windows.Forms.MessageBoxButtons]::OK, "
-                f"[System.Windows.Forms.MessageBoxIcon]::Warning)",
-            ],
-            check=False
+                f"[System.Windows.Forms.MessageBoxIcon]::{icon})",
+            ]
         )
 
+    def run_day_rollover(self):
+        """
+        Sleep until the next tracking day begins and prepare it: one batched
+        insert of the day's timing rows, then a flush of yesterday's buffered
+        usage and a reschedule of the violation deadlines. The boundary comes
+        from local time, so it stays correct across DST changes.
+        """
+        while not self.stop_event.is_set():
+            try:
+                boundary = next_day_start().timestamp()
+                # Wake up now and then in case the clock jumps or the machine sleeps
+                while not self.stop_event.is_set() and time.time() < boundary:
+                    self.stop_event.wait(min(boundary - time.time(), self.ROLLOVER_CHECK_INTERVAL))
+                if self.stop_event.is_set():
+                    break
+
+                logger.info("Day rollover, populating data for the new day...")
+                self.db.populate_data_today()
+                self.timings.flush()
+                self.violations.invalidate()  # Usage starts from zero again
+            except Exception as e:
+                logger.error(f"[{datetime.now()}] Error during day rollover: {e}")
+                self.stop_event.wait(self.ROLLOVER_CHECK_INTERVAL)
+
     def _handle_first_run_today(self):
         # Populate the DB with initial data if it is first run of the day
         is_data_populated = self.db.get_is_data_populated_today()
@@ -223,15 +316,28 @@ class Tracker:
 
     def stop(self):
         self.stop_event.set()
+        self.process_snapshots.stop()
+        self.violations.wake()
         self.classify_thread.join(timeout=2)
         self.update_thread.join(timeout=2)
         self.violation_handler_thread.join(timeout=2)
+        self.rollover_thread.join(timeout=2)
+        self.compaction_thread.join(timeout=2)
+        self.backup_thread.join(timeout=2)
+        self.timings.close()
+        self.db.close_open_sessions(time.time())
 
     def start(self):
         self._handle_first_run_today()
+        # Sessions left open by a crash end at their last heartbeat
+        self.db.close_open_sessions()
+        self.process_snapshots.start()
         self.update_thread.start()
         self.classify_thread.start()
         self.violation_handler_thread.start()
+        self.rollover_thread.start()
+        self.compaction_thread.start()
+        self.backup_thread.start()
 
 
 if __name__ == "__main__":
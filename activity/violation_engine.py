@@ -0,0 +1,166 @@
+import heapq
+import threading
+import time
+from typing import Callable, Iterable
+
+from log_utils import get_logger
+
+logger = get_logger("violation_engine", "tracker.log")
+
+
+class ViolationEngine:
+    """
+    Fires time limit warnings and kills at the moment a game reaches its limit.
+
+    Instead of polling, the engine keeps a heap of deadlines, one per running
+    game with a limit. A deadline is computed from the game's usage today and
+    its `timing_settings` limit and only recomputed when the set of running
+    games changes or the DB reports a settings write (edited limits). While no
+    deadline is due the engine sleeps and does no DB work.
+
+    Once a game is over its limit, each further step of the escalation
+    (warning, warning, ..., kill) is scheduled ESCALATION_INTERVAL seconds
+    after the previous one.
+    """
+
+    ESCALATION_INTERVAL = 10  # seconds between warnings once over the limit
+
+    def __init__(
+        self,
+        db,
+        on_warning: Callable[[str, int], None],
+        on_kill: Callable[[str], None],
+        violation_count_limit: int,
+    ):
+        self.db = db
+        self.on_warning = on_warning
+        self.on_kill = on_kill
+        self.violation_count_limit = violation_count_limit
+
+        self._condition = threading.Condition()
+        self._heap = []  # (deadline, seq, exe_name)
+        self._current = {}  # exe_name -> seq of its live heap entry
+        self._seq = 0
+        self._running = frozenset()
+        self._dirty = False
+        db.on_settings_change(self.invalidate)
+
+    def update_running(self, running_games: Iterable[str]):
+        """Tell the engine which games are running. Cheap if nothing changed."""
+        running_games = frozenset(running_games)
+        with self._condition:
+            if running_games == self._running:
+                return
+            self._running = running_games
+            self._dirty = True
+            self._condition.notify()
+
+    def invalidate(self):
+        """Recompute every deadline, e.g. after time limits were edited."""
+        with self._condition:
+            self._dirty = True
+            self._condition.notify()
+
+    def wake(self):
+        with self._condition:
+            self._condition.notify()
+
+    def run(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            with self._condition:
+                if self._dirty:
+                    self._dirty = False
+                    running = self._running
+                else:
+                    running = None
+                    self._condition.wait(timeout=self._time_until_next())
+
+            try:
+                if running is not None:
+                    self._reschedule(running)
+                    continue
+                self._fire_due()
+            except Exception as e:
+                logger.error(f"Error handling timing violations: {e}")
+                stop_event.wait(1)
+
+    def _time_until_next(self):
+        if self._heap:
+            return max(0.0, self._heap[0][0] - time.monotonic())
+        return None
+
+    def _reschedule(self, running):
+        deadlines = {}
+        for exe_name in running:
+            deadline = self._deadline_for(exe_name)
+            if deadline is not None:
+                deadlines[exe_name] = deadline
+
+        with self._condition:
+            self._heap = []
+            self._current = {}
+            for exe_name, deadline in deadlines.items():
+                self._push(exe_name, deadline)
+
+    def _deadline_for(self, exe_name):
+        max_time, _ = self.db.get_timing_settings_for_exe(exe_name)
+        if max_time <= 0.1:  # No limit set
+            return None
+        remaining = max_time * 60 - self.db.get_timing_for_exe(exe_name)
+        if remaining >= 0:
+            # Usage has to go past the limit, same as the old polling check
+            remaining += 1
+        elif self.db.get_violation_count_for_exe(exe_name) > 0:
+            # Already escalating, keep the pace instead of firing right away
+            remaining = self.ESCALATION_INTERVAL
+        return time.monotonic() + max(0, remaining)
+
+    def _push(self, exe_name, deadline):
+        self._seq += 1
+        self._current[exe_name] = self._seq
+        heapq.heappush(self._heap, (deadline, self._seq, exe_name))
+
+    def _fire_due(self):
+        now = time.monotonic()
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, exe_name = heapq.heappop(self._heap)
+                if self._current.get(exe_name) == seq and exe_name in self._running:
+                    del self._current[exe_name]
+                    due.append(exe_name)
+
+        for exe_name in due:
+            self._handle_violation(exe_name)
+
+    def _handle_violation(self, exe_name):
+        max_time, _ = self.db.get_timing_settings_for_exe(exe_name)
+        if max_time <= 0.1:
+            return
+        current_duration = self.db.get_timing_for_exe(exe_name)
+        if current_duration <= max_time * 60:
+            # Not there yet (e.g. usage was corrected), try again later. Read
+            # the DB before taking the condition, and drop the game if its
+            # limit was removed in the meantime.
+            deadline = self._deadline_for(exe_name)
+            if deadline is not None:
+                with self._condition:
+                    self._push(exe_name, deadline)
+            return
+
+        reason = (
+            f"Exceeded time limit of {max_time} minutes. "
+            f"Current duration: {current_duration // 60} minutes."
+        )
+        _, stage = self.db.record_violation(
+            exe_name, reason, kill_threshold=self.violation_count_limit
+        )
+
+        if stage == "warning":
+            self.on_warning(exe_name, max_time)
+        else:
+            self.on_kill(exe_name)
+
+        with self._condition:
+            if exe_name in self._running:
+                self._push(exe_name, time.monotonic() + self.ESCALATION_INTERVAL)
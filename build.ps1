@@ -30,6 +30,12 @@ if ($NoConsole) {
     $nuitkaArgs += "--windows-console-mode=force"
 }
 
+Write-Host '📚 Compiling game title store...'
+python -m activity.classifier.title_store
+
+Write-Host '🔎 Building game title index...'
+python -m activity.classifier.title_index
+
 Write-Host '🔨 Building project with Nuitka...'
 python -m nuitka @nuitkaArgs
 
@@ -1,15 +1,45 @@
+import base64
+import binascii
+import gzip
+import json
 import logging
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
 
-from flask import Flask, jsonify, render_template, request
+import zstandard
+
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 
 from dashboard import web_utils
-from data import DB
+from data import backup, open_db, transfer
+from data.days import day_key, iso_to_day
+from data.storage import DEFAULT_TIME_LIMIT, page_query
 from log_utils.logger_util import get_logger
 
 app = Flask(__name__)
 flask_logger = get_logger("flask_app", "flask_app.log")
 
-db_obj = DB()
+db_obj = open_db()
+
+STREAM_KEEPALIVE = 15  # seconds between SSE comments on an idle stream
+
+# /api/v1 item fields per dataset, in the row order of DB.get_page
+V1_FIELDS = {
+    "timings": ("exe_name", "date", "duration"),
+    "history": ("granularity", "bucket", "exe_name", "seconds"),
+    "violations": ("id", "exe_name", "timestamp", "reason"),
+    "processes": ("exe_name", "is_game", "user_marked", "max_time", "notify_limit"),
+}
+# Part of every ETag, so tags from before a restart never match
+ETAG_PREFIX = uuid.uuid4().hex[:8]
+COMPRESS_MIN_SIZE = 1024  # bytes, smaller JSON bodies are sent as is
+INDEX_CACHE_SIZE = 8  # view models kept for /
+INDEX_CACHE_TTL = 10  # seconds, buffered timings do not bump the write generation
+MAX_BULK_CHANGES = 5000  # changes accepted by one bulk update request
+MAX_TIME_LIMIT = 180  # minutes
 
 flask_logger = get_logger("flask_app", "flask_app.log")
 # --- 1. Replace Flask's logger ---
@@ -28,8 +58,74 @@ for handler in flask_logger.handlers:
     werkzeug_logger.addHandler(handler)
 
 
-@app.route("/")
-def index():
+def use_process_snapshots(service):
+    """
+    Share the tracker's process snapshot service with the dashboard so API calls
+    read the already sampled process table instead of scanning it again.
+    Set by main.py when the tracker runs in the same process.
+    """
+    app.extensions["process_snapshots"] = service
+
+
+def use_live_events(hub):
+    """
+    Share the tracker's LiveEventHub so /api/stream can push its changes.
+    Set by main.py when the tracker runs in the same process.
+    """
+    app.extensions["live_events"] = hub
+
+
+def _sse(event, data, event_id=None):
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def _stream_snapshot(hub):
+    """Full state sent when a subscriber connects or falls behind."""
+    timings = db_obj.get_timing_today()
+    return {
+        "running": sorted(hub.running),
+        "timings": {exe_name: duration for exe_name, duration, _ in timings},
+        "total": sum(duration for _, duration, _ in timings),
+    }
+
+
+class ViewModelCache:
+    """
+    Small LRU of computed page view models. Keys should include the DB write
+    generation, so any committed write makes older entries unreachable, and
+    entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (built at, view model)
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+        # Built outside the lock, concurrent misses may both build
+        view_model = build()
+        with self._lock:
+            self._entries[key] = (now, view_model)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return view_model
+
+
+index_cache = ViewModelCache(INDEX_CACHE_SIZE, INDEX_CACHE_TTL)
+
+
+def _index_view_model():
     timings = db_obj.get_timing_today()
     timings_for_display = []
 
@@ -45,7 +141,8 @@ def index():
         }
         timings_for_display.append(formatted_timing)
 
-    todays_timings = db_obj.get_total_time_today() or 0
+    # Same total as get_total_time_today, without reading the timings twice
+    todays_timings = sum(timing[1] for timing in timings)
     todays_timings_str = web_utils.convert_seconds_to_human_readable_extended(
         todays_timings
     )
@@ -66,29 +163,27 @@ def index():
                 }
             )
 
-    return render_template(
-        "index.html",
-        timings=timings_for_display,
-        todays_timings=todays_timings,
-        todays_timings_str=todays_timings_str,
-        formatted_violations=violations_by_exe,
-    )
+    return {
+        "timings": timings_for_display,
+        "todays_timings": todays_timings,
+        "todays_timings_str": todays_timings_str,
+        "formatted_violations": violations_by_exe,
+    }
+
+
+@app.route("/")
+def index():
+    # Read the generation before building, a write during the build then
+    # lands under a newer key instead of being hidden by this entry
+    key = (db_obj.path, day_key(), db_obj.get_write_generation())
+    view_model = index_cache.get_or_build(key, _index_view_model)
+    return render_template("index.html", **view_model)
 
 
 @app.route("/settings")
 def settings():
-    # Get all exes and their classifications
-    all_exes = db_obj.get_all_processes()
-    apps = []
-    for exe in all_exes:
-        exe_info = {
-            "name": exe[0],
-            "is_game": bool(exe[1]),
-            "user_marked": bool(exe[2]),
-        }
-        apps.append(exe_info)
-    # Sort apps to show games first
-    apps.sort(key=lambda x: (not x["is_game"], x["name"].lower()))
+    # The app classification list is loaded page by page from
+    # /api/v1/processes/search by settings.js
 
     # Get all time based settings
     time_limits = db_obj.get_all_timing_settings()
@@ -105,7 +200,6 @@ def settings():
 
     return render_template(
         "settings.html",
-        apps=apps,
         time_limit_settings=time_limit_settings,
         global_timing_limit=global_timing_limit,
     )
@@ -152,11 +246,52 @@ def are_games_running():
     if not isinstance(games, list):
         return jsonify({"error": "Games should be a list"}), 400
 
-    running_games = web_utils.check_if_processes_running(exe_names=games)
+    # A stale snapshot (tracker stalled) falls back to a scan
+    process_snapshots = app.extensions.get("process_snapshots")
+    snapshot = process_snapshots.fresh() if process_snapshots else None
+    running_games = web_utils.check_if_processes_running(
+        exe_names=games, snapshot=snapshot
+    )
 
     return jsonify({"running_games": running_games})
 
 
+@app.route("/api/stream")
+def stream():
+    """
+    Server-Sent Events stream of running games and timing deltas.
+    Starts with a 'snapshot' event, then sends 'running', 'timings' and 'day'
+    events as the tracker publishes them. Every open tab waits on the same
+    in-memory hub, nothing is sampled per subscriber.
+    """
+    hub = app.extensions.get("live_events")
+    if hub is None:
+        # Tracker not running in this process, the page falls back to polling
+        return Response(status=204)
+
+    def events():
+        version, snapshot = hub.snapshot(lambda: _stream_snapshot(hub))
+        yield _sse("snapshot", snapshot, version)
+        while True:
+            result = hub.wait_for_events(version, timeout=STREAM_KEEPALIVE)
+            if result is None:
+                yield ": keep-alive\n\n"
+                continue
+            version, new_events = result
+            if new_events is None:
+                version, snapshot = hub.snapshot(lambda: _stream_snapshot(hub))
+                yield _sse("snapshot", snapshot, version)
+                continue
+            for event_version, name, data in new_events:
+                yield _sse(name, data, event_version)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/update_global_timing", methods=["POST"])
 def update_global_timing():
     """
@@ -221,6 +356,19 @@ def refresh_time_limit_list():
         )
 
 
+def _parse_time_limit(value):
+    """Validate a per-game time limit in minutes. Returns (max_time, error)."""
+    try:
+        max_time = int(value)
+    except (TypeError, ValueError):
+        return None, "Time limits must be non-negative integers. Nice try."
+    if max_time < 0:
+        return None, "Time limits must be non-negative integers. Nice try."
+    if max_time > MAX_TIME_LIMIT:  # Max 3 hours
+        return None, "180 minutes is the max. Go touch some grass 🌱"
+    return max_time, None
+
+
 @app.route("/api/update_time_limit", methods=["POST"])
 def update_time_limit():
     """
@@ -235,26 +383,461 @@ def update_time_limit():
         return jsonify({"error": "Missing required fields in request body."}), 400
 
     exe_name = data["exe_name"]
-    max_time = int(data["max_time"])
+    max_time, error = _parse_time_limit(data["max_time"])
+    if error:
+        return jsonify({"error": error}), 400
 
-    if max_time < 0:
-        return (
-            jsonify({"error": "Time limits must be non-negative integers. Nice try."}),
+    db_obj.update_timing_settings(exe_name, max_time)
+
+    return jsonify(
+        {
+            "status": "success",
+            "message": f"Time limit for {exe_name} updated successfully.",
+        }
+    )
+
+
+def _bulk_changes():
+    """
+    Read the 'changes' array of a bulk update request.
+    Returns (changes, None) or (None, error response).
+    """
+    if not request.is_json:
+        return None, (jsonify({"error": "Expected JSON. You sent something else."}), 400)
+    changes = (request.get_json(silent=True) or {}).get("changes")
+    if not isinstance(changes, list) or not changes:
+        return None, (jsonify({"error": "Changes should be a non-empty list."}), 400)
+    if len(changes) > MAX_BULK_CHANGES:
+        return None, (
+            jsonify({"error": f"At most {MAX_BULK_CHANGES} changes per request."}),
             400,
         )
+    return changes, None
 
-    if max_time > 180:  # Max 3 hours
-        return jsonify({"error": "180 minutes is the max. Go touch some grass 🌱"}), 400
 
-    db_obj.update_timing_settings(exe_name, max_time)
+def _bulk_change_error(change, required):
+    if not isinstance(change, dict) or any(field not in change for field in required):
+        return "Missing required fields in change."
+    if not isinstance(change["exe_name"], str) or not change["exe_name"]:
+        return "exe_name should be a non-empty string."
+    return None
 
+
+def _bulk_error(change, message):
+    exe_name = change.get("exe_name") if isinstance(change, dict) else None
+    return {"exe_name": exe_name, "status": "error", "error": message}
+
+
+def _bulk_response(results, what):
+    updated = sum(result["status"] == "success" for result in results)
     return jsonify(
         {
-            "status": "success",
-            "message": f"Time limit for {exe_name} updated successfully.",
+            "status": "success" if updated == len(results) else "partial",
+            "message": f"Updated {what} for {updated} of {len(results)} executables.",
+            "results": results,
         }
     )
 
 
+@app.route("/api/bulk/update_exe_classification", methods=["POST"])
+def bulk_update_exe_classification():
+    """
+    API endpoint to classify many executables at once.
+    Expects a JSON payload with a 'changes' list of {'exe_name', 'is_game'}
+    objects. Every valid change is written in a single transaction, the
+    response has a result per change, in request order.
+    """
+    changes, error = _bulk_changes()
+    if error:
+        return error
+
+    results, valid = [], []
+    for change in changes:
+        message = _bulk_change_error(change, ("exe_name", "is_game"))
+        if message:
+            results.append(_bulk_error(change, message))
+            continue
+        # If user is updating, we assume they are marking it themselves
+        valid.append((change["exe_name"], bool(change["is_game"]), 1))
+        results.append({"exe_name": change["exe_name"], "status": "success"})
+
+    db_obj.upsert_is_game_bulk(valid)
+    return _bulk_response(results, "classification")
+
+
+@app.route("/api/bulk/update_time_limit", methods=["POST"])
+def bulk_update_time_limit():
+    """
+    API endpoint to update the time limits of many games at once.
+    Expects a JSON payload with a 'changes' list of {'exe_name', 'max_time'}
+    objects. Every valid change is written in a single transaction, the
+    response has a result per change, in request order.
+    """
+    changes, error = _bulk_changes()
+    if error:
+        return error
+
+    results, valid = [], []
+    for change in changes:
+        message = _bulk_change_error(change, ("exe_name", "max_time"))
+        if message:
+            results.append(_bulk_error(change, message))
+            continue
+        max_time, message = _parse_time_limit(change["max_time"])
+        if message:
+            results.append(_bulk_error(change, message))
+            continue
+        # notify_limit is not editable, same default as update_timing_settings
+        valid.append((change["exe_name"], max_time, DEFAULT_TIME_LIMIT))
+        results.append({"exe_name": change["exe_name"], "status": "success"})
+
+    rejected = db_obj.update_timing_settings_bulk(valid)
+    for result in results:
+        if result["status"] == "success" and result["exe_name"] in rejected:
+            result["status"] = "error"
+            result["error"] = rejected[result["exe_name"]]
+    return _bulk_response(results, "time limits")
+
+
+@app.route("/api/export/<dataset>", methods=["GET"])
+def export_data(dataset):
+    """
+    API endpoint to download a dataset (timings, sessions or violations).
+    `?format=` is csv (default), jsonl or parquet. CSV and JSON Lines are
+    streamed while the rows are read.
+    """
+    fmt = request.args.get("format", "csv")
+    if dataset not in transfer.EXPORT_COLUMNS:
+        return jsonify({"error": f"Unknown dataset '{dataset}'."}), 400
+    if fmt not in transfer.FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}'."}), 400
+
+    headers = {"Content-Disposition": f"attachment; filename={dataset}.{fmt}"}
+    if fmt != "parquet":
+        return Response(
+            stream_with_context(transfer.iter_export(db_obj, dataset, fmt)),
+            mimetype=transfer.MIMETYPES[fmt],
+            headers=headers,
+        )
+
+    # Parquet is written to a temp file (spilled to disk when large) first
+    spool = tempfile.SpooledTemporaryFile(  # pylint: disable=consider-using-with
+        max_size=8 * 1024 * 1024
+    )
+    try:
+        transfer.export_parquet(db_obj, dataset, spool)
+    except ImportError as e:
+        spool.close()
+        return jsonify({"error": str(e)}), 501
+    spool.seek(0)
+
+    def generate():
+        with spool:
+            while chunk := spool.read(64 * 1024):
+                yield chunk
+
+    return Response(generate(), mimetype=transfer.MIMETYPES[fmt], headers=headers)
+
+
+@app.route("/api/import/<dataset>", methods=["POST"])
+def import_data(dataset):
+    """
+    API endpoint to import a dataset exported by /api/export.
+    Accepts a multipart upload in the 'file' field or the raw request body.
+    `?format=` defaults to the uploaded file's extension, then to csv.
+    """
+    if dataset not in transfer.EXPORT_COLUMNS:
+        return jsonify({"error": f"Unknown dataset '{dataset}'."}), 400
+
+    upload = request.files.get("file")
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "csv"
+        if upload is not None and upload.filename:
+            try:
+                fmt = transfer.format_from_path(upload.filename)
+            except ValueError:
+                pass
+    if fmt not in transfer.FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}'."}), 400
+
+    source = upload.stream if upload is not None else request.stream
+    try:
+        if fmt == "parquet":
+            # Parquet readers need to seek
+            with tempfile.TemporaryFile() as f:
+                while chunk := source.read(64 * 1024):
+                    f.write(chunk)
+                f.seek(0)
+                count = transfer.import_from_file(db_obj, dataset, f, fmt)
+        else:
+            count = transfer.import_from_file(db_obj, dataset, source, fmt)
+    except ImportError as e:
+        return jsonify({"error": str(e)}), 501
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({"error": f"Could not import {dataset}: {e}"}), 400
+
+    return jsonify(
+        {"status": "success", "message": f"Imported {count} {dataset} rows.", "count": count}
+    )
+
+
+@app.route("/api/backups", methods=["GET"])
+def list_backups():
+    """
+    API endpoint to list the database backups, newest first.
+    """
+    return jsonify({"backups": backup.list_backups(db_obj)})
+
+
+@app.route("/api/backups", methods=["POST"])
+def create_backup():
+    """
+    API endpoint to take a backup right now.
+    Optional JSON payload: {"compress": bool}.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        name = backup.create_backup(db_obj, compress=data.get("compress"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Backup failed: {str(e)}"}), 500
+
+    return jsonify({"status": "success", "message": f"Created backup {name}.", "backup": name})
+
+
+@app.route("/api/backups/restore", methods=["POST"])
+def restore_backup():
+    """
+    API endpoint to restore a backup while the tracker keeps running.
+    Expects a JSON payload with the backup file name in 'backup'.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Expected JSON. You sent something else."}), 400
+
+    data = request.get_json()
+    if "backup" not in data:
+        return jsonify({"error": "Missing required fields in request body."}), 400
+
+    try:
+        backup.restore_backup(db_obj, data["backup"])
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(
+        {"status": "success", "message": f"Restored backup {data['backup']}."}
+    )
+
+##### Versioned read API #####
+def _encode_cursor(sort, descending, after):
+    if after is None:
+        return None
+    raw = json.dumps([sort, descending, *after]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor, sort, descending):
+    """Return the `after` values of a cursor, checking it was made for this order."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(values, list) or values[:2] != [sort, descending]:
+        raise ValueError("Cursor does not match the sort order.")
+    return values[2:]
+
+
+def _int_arg(name, parse=int):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return parse(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid value for '{name}'.") from e
+
+
+def _versioned_json(prepare, build):
+    """
+    JSON response for a /api/v1 read, or 304 when the client's ETag still
+    matches the data version. prepare() parses and validates the request,
+    a ValueError from it is a 400 even for a matching ETag. build(args) gets
+    its result and only runs, so the DB is only queried, when the data changed.
+    """
+    try:
+        args = prepare()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    etag = f"{ETAG_PREFIX}-" + "-".join(str(part) for part in db_obj.get_data_version())
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build(args))
+    response.set_etag(etag, weak=True)
+    # Let browsers keep the page but always revalidate it
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _page_response(dataset, default_order="desc", **filters):
+    """Read one page of a dataset with the sort/order/limit/cursor query arguments."""
+
+    def prepare():
+        sort = request.args.get("sort") or None
+        order = request.args.get("order", default_order)
+        if order not in ("asc", "desc"):
+            raise ValueError("Order should be 'asc' or 'desc'.")
+        descending = order == "desc"
+        args = {
+            "sort": sort,
+            "descending": descending,
+            "after": _decode_cursor(request.args.get("cursor"), sort, descending),
+            "limit": _int_arg("limit") or 100,
+        }
+        page_query(dataset, args["sort"], args["after"], args["limit"], **filters)
+        return args
+
+    def build(args):
+        rows, next_after = db_obj.get_page(dataset, **args, **filters)
+        return {
+            "items": [dict(zip(V1_FIELDS[dataset], row)) for row in rows],
+            "next_cursor": _encode_cursor(args["sort"], args["descending"], next_after),
+        }
+
+    return _versioned_json(prepare, build)
+
+
+@app.route("/api/v1/timings", methods=["GET"])
+def v1_timings():
+    """
+    Daily timings, newest first by default.
+    Filters: exe_name, start and end (YYYY-MM-DD, inclusive).
+    Sort by day, duration or exe_name.
+    """
+    try:
+        filters = {
+            "exe_name": request.args.get("exe_name"),
+            "start_day": _int_arg("start", iso_to_day),
+            "end_day": _int_arg("end", iso_to_day),
+        }
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _page_response("timings", **filters)
+
+
+@app.route("/api/v1/history", methods=["GET"])
+def v1_history():
+    """
+    Usage rollups, newest first by default.
+    Filters: granularity (hour/day/week/month), start and end (inclusive
+    buckets), exe_name. Sort by bucket, seconds or exe_name.
+    """
+    try:
+        filters = {
+            "granularity": request.args.get("granularity"),
+            "start": _int_arg("start"),
+            "end": _int_arg("end"),
+            "exe_name": request.args.get("exe_name"),
+        }
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _page_response("history", **filters)
+
+
+@app.route("/api/v1/violations", methods=["GET"])
+def v1_violations():
+    """
+    Violation audit log, newest first by default.
+    Filters: exe_name, since and until (ISO timestamps, until is exclusive).
+    Sort by timestamp or exe_name.
+    """
+    filters = {
+        "exe_name": request.args.get("exe_name"),
+        "since": request.args.get("since"),
+        "until": request.args.get("until"),
+    }
+    return _page_response("violations", **filters)
+
+
+@app.route("/api/v1/processes", methods=["GET"])
+def v1_processes():
+    """
+    Classified executables with their time limits, by name by default.
+    Filters: is_game and user_marked (0 or 1). Sort by exe_name or is_game.
+    """
+    try:
+        filters = {
+            "is_game": _int_arg("is_game"),
+            "user_marked": _int_arg("user_marked"),
+        }
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _page_response("processes", default_order="asc", **filters)
+
+
+@app.route("/api/v1/processes/search", methods=["GET"])
+def v1_process_search():
+    """
+    Search classified executables by name, games first and then by name.
+    `q` is matched anywhere in the name, or at its start with match=prefix.
+    Paged with limit/cursor like the other /api/v1 endpoints.
+    """
+
+    def prepare():
+        match = request.args.get("match", "substring")
+        if match not in ("substring", "prefix"):
+            raise ValueError("Match should be 'substring' or 'prefix'.")
+        after = _decode_cursor(request.args.get("cursor"), "games_first", False)
+        if after is not None and len(after) != 2:
+            raise ValueError("Cursor does not match the sort order.")
+        return {
+            "query": request.args.get("q", "").strip(),
+            "prefix": match == "prefix",
+            "after": after,
+            "limit": _int_arg("limit") or 50,
+        }
+
+    def build(args):
+        rows, next_after = db_obj.search_processes(**args)
+        return {
+            "items": [
+                {"exe_name": exe_name, "is_game": bool(is_game), "user_marked": bool(user_marked)}
+                for exe_name, is_game, user_marked in rows
+            ],
+            "next_cursor": _encode_cursor("games_first", False, next_after),
+        }
+
+    return _versioned_json(prepare, build)
+
+
+@app.after_request
+def compress_response(response):
+    """Compress /api/v1 JSON with zstd or gzip, whichever the client accepts."""
+    if (
+        not request.path.startswith("/api/v1/")
+        or response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    accepted = request.accept_encodings
+    if accepted["zstd"]:
+        response.set_data(zstandard.ZstdCompressor(level=3).compress(body))
+        response.headers["Content-Encoding"] = "zstd"
+    elif accepted["gzip"]:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
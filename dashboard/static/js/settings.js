@@ -52,80 +52,121 @@ window.addEventListener("DOMContentLoaded", () => {
 
 /*-----------------------------------------Classifications Section-----------------------------------------*/
 
-const rowsPerPage = 10;
-let currentPage = 1;
-let filteredRows = [];
-
-function filterAndPaginate() {
-    const searchValue = document
-        .getElementById("hs-table-search")
-        .value.toLowerCase();
-    const allRows = Array.from(
-        document.querySelectorAll("#classifications tbody tr")
+const appsPerPage = 50;
+let appsQuery = "";
+let appsCursor = null;
+let appsLoaded = 0;
+let appsLoading = false;
+let appsDone = false;
+let appsRequest = 0; // Bumped on every new search, stale responses are dropped
+let searchTimer = null;
+
+function appendAppRow(app) {
+    const template = document.getElementById("appRowTemplate");
+    const row = template.content.firstElementChild.cloneNode(true);
+    row.querySelector(".appName").textContent = app.exe_name;
+
+    const checkbox = row.querySelector(".appToggle");
+    checkbox.checked = app.is_game;
+    checkbox.addEventListener("change", () =>
+        handleGameToggle(checkbox, app.exe_name)
     );
 
-    // If search value is empty, show all rows
-    if (searchValue === "") {
-        filteredRows = allRows;
-        currentPage = 1; // Reset to first page
-        renderTable();
-        return;
-    }
-
-    // Filter rows
-    filteredRows = allRows.filter((row) => {
-        const appName = row.children[0].textContent.toLowerCase();
-        return appName.includes(searchValue);
-    });
-
-    renderTable();
-}
-
-function renderTable() {
-    const tbody = document.querySelector("#classifications tbody");
-    tbody.innerHTML = "";
-
-    const start = (currentPage - 1) * rowsPerPage;
-    const end = start + rowsPerPage;
-    const paginatedRows = filteredRows.slice(start, end);
-
-    paginatedRows.forEach((row) => tbody.appendChild(row));
-
-    updatePaginationInfo();
+    document.getElementById("appsBody").appendChild(row);
 }
 
 function updatePaginationInfo() {
     const info = document.getElementById("paginationInfo");
-    const totalPages = Math.ceil(filteredRows.length / rowsPerPage);
-    info.textContent = `Page ${currentPage} of ${totalPages}`;
+    if (appsLoading) {
+        info.textContent = "Loading...";
+    } else if (appsLoaded === 0) {
+        info.textContent = appsQuery ? `No apps matching "${appsQuery}"` : "No apps yet";
+    } else {
+        info.textContent = `Showing ${appsLoaded} apps${appsDone ? "" : ", scroll for more"}`;
+    }
 }
 
-function nextPage() {
-    const totalPages = Math.ceil(filteredRows.length / rowsPerPage);
-    if (currentPage < totalPages) {
-        currentPage++;
-        renderTable();
+function loadMoreApps() {
+    if (appsLoading || appsDone) {
+        return;
     }
-}
+    appsLoading = true;
+    updatePaginationInfo();
 
-function prevPage() {
-    if (currentPage > 1) {
-        currentPage--;
-        renderTable();
+    const request = appsRequest;
+    const params = new URLSearchParams({ q: appsQuery, limit: appsPerPage });
+    if (appsCursor) {
+        params.set("cursor", appsCursor);
     }
+
+    fetch(`${processSearchURL}?${params}`)
+        .then((response) => {
+            if (!response.ok) {
+                throw new Error("Network response was not ok");
+            }
+            return response.json();
+        })
+        .then((data) => {
+            if (request !== appsRequest) {
+                return; // The search changed while this page was loading
+            }
+            data.items.forEach(appendAppRow);
+            appsLoaded += data.items.length;
+            appsCursor = data.next_cursor;
+            appsDone = !appsCursor;
+        })
+        .catch((error) => {
+            console.error("Error loading apps:", error);
+        })
+        .finally(() => {
+            if (request !== appsRequest) {
+                return;
+            }
+            appsLoading = false;
+            updatePaginationInfo();
+            // Keep going until the list fills the scroll area
+            const sentinel = document.getElementById("appsSentinel");
+            const scroller = document.getElementById("appsScroll");
+            if (
+                !appsDone &&
+                scroller.offsetParent !== null &&
+                sentinel.getBoundingClientRect().top <=
+                    scroller.getBoundingClientRect().bottom
+            ) {
+                loadMoreApps();
+            }
+        });
 }
 
-// Bind search input
-document.getElementById("hs-table-search").addEventListener("input", () => {
-    currentPage = 1;
-    filterAndPaginate();
-});
+function searchApps(query) {
+    appsQuery = query.trim();
+    appsCursor = null;
+    appsLoaded = 0;
+    appsLoading = false;
+    appsDone = false;
+    appsRequest++;
+    document.getElementById("appsBody").innerHTML = "";
+    document.getElementById("appsScroll").scrollTop = 0;
+    loadMoreApps();
+}
 
-// Initial setup after DOM is loaded
-document.addEventListener("DOMContentLoaded", () => {
-    filterAndPaginate();
+// Bind search input, searching once the user stops typing
+document.getElementById("hs-table-search").addEventListener("input", (event) => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => searchApps(event.target.value), 250);
 });
 
+// Load the next page when the bottom of the list scrolls into view. This also
+// loads the first page once the classifications section is shown.
+new IntersectionObserver(
+    (entries) => {
+        if (entries.some((entry) => entry.isIntersecting)) {
+            loadMoreApps();
+        }
+    },
+    { root: document.getElementById("appsScroll") }
+).observe(document.getElementById("appsSentinel"));
+
 let toggleState = {
     checkbox: null,
     appName: "",
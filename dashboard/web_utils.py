@@ -43,14 +43,15 @@ def convert_seconds_to_human_readable_extended(seconds: int) -> str:
     return f"{hours} hours, {minutes} minutes, {remaining_seconds} seconds"
 
 
-def check_if_processes_running(exe_names: List[str]) -> dict[str, bool]:
+def check_if_processes_running(exe_names: List[str], snapshot=None) -> dict[str, bool]:
+    # Reuse the tracker's process snapshot when one has been published
+    if snapshot is not None:
+        return {exe_name: snapshot.is_running(exe_name) for exe_name in exe_names}
+
+    # Fallback scan, only the name is read for every process
     running_exes = {exe_name: False for exe_name in exe_names}
-    running_processes = psutil.process_iter(["name", "exe"])
-    # Create a set of running process names for quick lookup
-    for process in running_processes:
-        try:
-            if process.name() in exe_names:
-                running_exes[process.name()] = True
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
+    for process in psutil.process_iter(["name"]):
+        name = process.info["name"]
+        if name in running_exes:
+            running_exes[name] = True
     return running_exes
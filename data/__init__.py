@@ -1 +1,6 @@
+from .archive import Compactor
+from .backends import open_db
+from .memory_store import MemoryDB
 from .orm import DB
+from .storage import Storage
+from .timing_accumulator import TimingAccumulator
@@ -0,0 +1,154 @@
+"""
+Retention for the tracker database.
+
+Rows older than the retention horizon are moved out of the live tables into
+zstandard compressed JSON Lines files in an `archive` directory next to the DB,
+one file per table and (at most) ARCHIVE_SPAN_DAYS days. The `archives` table
+records which days every file covers, so DB read methods only open the files a
+query actually reaches.
+"""
+
+import io
+import json
+import os
+import threading
+from datetime import datetime
+
+import zstandard
+from dotenv import load_dotenv
+
+from log_utils import get_logger
+
+from .days import day_key, day_start
+
+load_dotenv()
+
+logger = get_logger("archive", "tracker.log")
+
+# Days of history kept in the live tables. Overridden by the `retention_days`
+# setting, 0 disables archiving.
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "180"))
+ARCHIVE_SPAN_DAYS = 31
+COMPRESSION_LEVEL = 10
+
+# table -> (archived columns, column the retention horizon applies to)
+ARCHIVED_TABLES = {
+    "timings": ("exe_name, day, duration", "day"),
+    "daily_usage": ("day, total_time", "day"),
+    "violation_state": ("exe_name, day, warning_count, first_at, last_at, stage", "day"),
+    "violations": ("id, exe_name, timestamp, reason", "timestamp"),
+    "sessions": ("id, exe_name, pid, start_ts, end_ts, closed", "start_ts"),
+}
+
+# Day keyed bookkeeping that is dropped without being archived
+PRUNED_TABLES = ("is_data_populated_today",)
+# Rollup granularities dropped past the horizon. Old days stay readable from
+# the archived timings, week and month buckets are kept for good.
+PRUNED_ROLLUPS = ("hour", "day")
+
+
+def day_bound(table, day):
+    """Value of the table's horizon column at the start of a tracking day."""
+    column = ARCHIVED_TABLES[table][1]
+    if column == "timestamp":
+        return day_start(day).isoformat()
+    if column == "start_ts":
+        return day_start(day).timestamp()
+    return day
+
+
+def row_day(table, value):
+    """Tracking day of a horizon column value."""
+    column = ARCHIVED_TABLES[table][1]
+    if column == "timestamp":
+        return day_key(datetime.fromisoformat(value))
+    if column == "start_ts":
+        return day_key(datetime.fromtimestamp(value))
+    return value
+
+
+def write_archive(path, rows):
+    """Write rows as zstd compressed JSON Lines, atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+    with open(tmp_path, "wb") as f:
+        with compressor.stream_writer(f, closefd=False) as writer:
+            for row in rows:
+                writer.write((json.dumps(list(row)) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_archive(path):
+    """Yield the rows of an archive file as lists, decompressing as it goes."""
+    with open(path, "rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f)
+        for line in io.TextIOWrapper(reader, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+
+
+class Compactor:
+    """
+    Background retention job.
+
+    Every COMPACT_INTERVAL it archives live rows older than the retention
+    horizon, one span at a time, and then hands the freed pages back to the
+    file system with incremental vacuum steps. Each step is a short write
+    transaction, so the tracker and dashboard keep writing in between.
+    """
+
+    COMPACT_INTERVAL = 6 * 60 * 60  # seconds
+    STARTUP_DELAY = 60  # seconds, let the tracker settle first
+    VACUUM_PAGES = 256  # pages freed per vacuum step
+    STEP_PAUSE = 0.05  # seconds between steps
+
+    def __init__(self, db, retention_days=None):
+        self.db = db
+        self.retention_days = retention_days
+
+    def get_retention_days(self):
+        if self.retention_days is not None:
+            return self.retention_days
+        return int(self.db.get_settings("retention_days", RETENTION_DAYS))
+
+    def run(self, stop_event: threading.Event):
+        if stop_event.wait(self.STARTUP_DELAY):
+            return
+        while not stop_event.is_set():
+            try:
+                self.compact(stop_event)
+            except Exception as e:
+                logger.error(f"Error compacting database: {e}")
+            stop_event.wait(self.COMPACT_INTERVAL)
+
+    def compact(self, stop_event: threading.Event = None):
+        """Archive everything past the horizon, then vacuum. Returns rows archived."""
+        stop_event = stop_event or threading.Event()
+        retention_days = self.get_retention_days()
+        if retention_days <= 0 or not self.db.persistent:
+            return 0
+
+        cutoff_day = day_key() - retention_days
+        archived = 0
+        for table in ARCHIVED_TABLES:
+            while not stop_event.is_set():
+                count = self.db.archive_rows_before(table, cutoff_day)
+                if not count:
+                    break
+                archived += count
+                stop_event.wait(self.STEP_PAUSE)
+        for table in PRUNED_TABLES:
+            self.db.prune_rows_before(table, cutoff_day)
+        self.db.prune_rollups_before(PRUNED_ROLLUPS, cutoff_day)
+
+        while not stop_event.is_set():
+            if not self.db.incremental_vacuum(self.VACUUM_PAGES):
+                break
+            stop_event.wait(self.STEP_PAUSE)
+
+        if archived:
+            logger.info(f"Archived {archived} rows older than {retention_days} days.")
+        return archived
@@ -0,0 +1,29 @@
+import os
+
+from dotenv import load_dotenv
+
+from .memory_store import MemoryDB
+from .orm import DB, MEMORY_DB_URI
+
+load_dotenv()
+
+# "sqlite" (the database file), "sqlite-memory" (shared-cache in-memory
+# SQLite) or "memory" (MemoryDB, plain dicts)
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite").lower()
+BACKENDS = ("sqlite", "sqlite-memory", "memory")
+
+
+def open_db(backend=None, name=None):
+    """
+    Open the storage selected by `backend` (default: the DB_BACKEND env var).
+    `name` is the database file for "sqlite" and the store name for the in-memory
+    backends, stores opened with the same name share their data.
+    """
+    backend = (backend or DB_BACKEND).lower()
+    if backend == "sqlite":
+        return DB(name) if name else DB()
+    if backend == "sqlite-memory":
+        return DB(MEMORY_DB_URI.format(name=name or "fixlife"))
+    if backend == "memory":
+        return MemoryDB(name or "fixlife")
+    raise ValueError(f"Unknown DB backend '{backend}', use one of {', '.join(BACKENDS)}.")
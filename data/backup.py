@@ -0,0 +1,163 @@
+"""
+Online backups of the tracker database.
+
+Snapshots are taken with SQLite's backup API a few pages at a time, so the
+tracker keeps writing while a backup runs. Every snapshot is verified, then
+optionally zstd compressed, and only the newest BACKUP_KEEP are kept in a
+`backups` directory next to the DB.
+"""
+
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import zstandard
+from dotenv import load_dotenv
+
+from log_utils import get_logger
+
+load_dotenv()
+
+logger = get_logger("backup", "tracker.log")
+
+# Overridden by the backup_interval_hours / backup_keep / backup_compress settings
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_COMPRESS = os.getenv("BACKUP_COMPRESS", "1")
+
+BACKUP_NAME = re.compile(r"^game_tracker-\d{8}-\d{6}\.db(\.zst)?$")
+
+
+def backup_dir(db):
+    return os.path.join(os.path.dirname(os.path.abspath(db.path)), "backups")
+
+
+def list_backups(db):
+    """Return backup file names, newest first."""
+    directory = backup_dir(db)
+    if not os.path.isdir(directory):
+        return []
+    names = (name for name in os.listdir(directory) if BACKUP_NAME.match(name))
+    return sorted(names, reverse=True)
+
+
+def backup_path(db, name):
+    if not BACKUP_NAME.match(name):
+        raise ValueError(f"'{name}' is not a backup file name.")
+    path = os.path.join(backup_dir(db), name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Backup '{name}' does not exist.")
+    return path
+
+
+def _compress(src, dest):
+    compressor = zstandard.ZstdCompressor(level=10)
+    tmp_dest = dest + ".tmp"
+    with open(src, "rb") as f, open(tmp_dest, "wb") as out:
+        compressor.copy_stream(f, out)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_dest, dest)
+
+
+@contextmanager
+def opened_backup(path):
+    """Yield a plain SQLite file for a backup, decompressing .zst backups to a temp file."""
+    if not path.endswith(".zst"):
+        yield path
+        return
+    fd, tmp_path = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as out, open(path, "rb") as f:
+            zstandard.ZstdDecompressor().copy_stream(f, out)
+        yield tmp_path
+    finally:
+        os.remove(tmp_path)
+
+
+def create_backup(db, compress=None, keep=None):
+    """Take, verify and rotate a snapshot of the DB. Returns the backup file name."""
+    if not db.persistent:
+        raise ValueError("In-memory storage cannot be backed up.")
+    if compress is None:
+        compress = db.get_settings("backup_compress", BACKUP_COMPRESS) == "1"
+    if keep is None:
+        keep = int(db.get_settings("backup_keep", BACKUP_KEEP))
+
+    directory = backup_dir(db)
+    os.makedirs(directory, exist_ok=True)
+    name = f"game_tracker-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+    path = os.path.join(directory, name)
+    tmp_path = path + ".tmp"
+    try:
+        db.backup_to(tmp_path)
+        if not db.verify_backup(tmp_path):
+            raise RuntimeError("Backup failed the integrity check.")
+        if compress:
+            name += ".zst"
+            _compress(tmp_path, path + ".zst")
+        else:
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    for old in list_backups(db)[max(keep, 1):]:
+        os.remove(os.path.join(directory, old))
+    logger.info(f"Created backup {name}.")
+    return name
+
+
+def verify_backup(db, name):
+    with opened_backup(backup_path(db, name)) as path:
+        return db.verify_backup(path)
+
+
+def restore_backup(db, name):
+    """Replace the live DB contents with a backup while the tracker keeps running."""
+    with opened_backup(backup_path(db, name)) as path:
+        if not db.verify_backup(path):
+            raise ValueError(f"Backup '{name}' is damaged, not restoring it.")
+        db.restore_from(path)
+    logger.info(f"Restored backup {name}.")
+
+
+class BackupJob:
+    """Background job creating a backup every BACKUP_INTERVAL_HOURS."""
+
+    STARTUP_DELAY = 5 * 60  # seconds
+    RETRY_DELAY = 10 * 60  # seconds
+
+    def __init__(self, db):
+        self.db = db
+
+    def _interval(self):
+        hours = self.db.get_settings("backup_interval_hours", BACKUP_INTERVAL_HOURS)
+        return float(hours) * 3600
+
+    def _seconds_until_due(self):
+        backups = list_backups(self.db)
+        if not backups:
+            return 0
+        last = os.path.getmtime(os.path.join(backup_dir(self.db), backups[0]))
+        return max(0.0, last + self._interval() - datetime.now().timestamp())
+
+    def run(self, stop_event: threading.Event):
+        if not self.db.persistent or stop_event.wait(self.STARTUP_DELAY):
+            return
+        while not stop_event.is_set():
+            try:
+                if self._interval() <= 0:  # Backups turned off
+                    stop_event.wait(self.RETRY_DELAY)
+                    continue
+                wait = self._seconds_until_due()
+                if wait > 0:
+                    stop_event.wait(min(wait, self.RETRY_DELAY))
+                    continue
+                create_backup(self.db)
+            except Exception as e:
+                logger.error(f"Error creating backup: {e}")
+                stop_event.wait(self.RETRY_DELAY)
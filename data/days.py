@@ -0,0 +1,54 @@
+import os
+from datetime import date, datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Hour (local time) at which a new tracking day starts. 0 means midnight, 4
+# would count a late night session until 4am towards the previous day.
+DAY_RESET_HOUR = int(os.getenv("DAY_RESET_HOUR", "0"))
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_key(moment: datetime = None) -> int:
+    """Return the tracking day of a local datetime as days since 1970-01-01."""
+    moment = moment or datetime.now()
+    return ((moment - timedelta(hours=DAY_RESET_HOUR)).date() - EPOCH).days
+
+
+def day_to_iso(day: int) -> str:
+    return (EPOCH + timedelta(days=day)).isoformat()
+
+
+def iso_to_day(iso_date: str) -> int:
+    return (date.fromisoformat(iso_date[:10]) - EPOCH).days
+
+
+def day_start(day: int) -> datetime:
+    """Return the local datetime at which the tracking day begins."""
+    return datetime.combine(EPOCH + timedelta(days=day), datetime.min.time()) + timedelta(
+        hours=DAY_RESET_HOUR
+    )
+
+
+def next_day_start(moment: datetime = None) -> datetime:
+    """Return the local datetime at which the tracking day after `moment` begins."""
+    return day_start(day_key(moment) + 1)
+
+
+def split_by_day(start_ts: float, end_ts: float) -> dict:
+    """
+    Split the span between two timestamps into {day: seconds} by tracking day.
+    Boundaries are converted with local time, so days that are 23 or 25 hours
+    long because of a DST change are split at their real start.
+    """
+    seconds_by_day = {}
+    day = day_key(datetime.fromtimestamp(start_ts))
+    while start_ts < end_ts:
+        boundary = min(day_start(day + 1).timestamp(), end_ts)
+        seconds_by_day[day] = seconds_by_day.get(day, 0) + boundary - start_ts
+        start_ts = boundary
+        day += 1
+    return seconds_by_day
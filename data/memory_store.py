@@ -0,0 +1,498 @@
+import operator
+import string
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from .days import day_key, day_start, day_to_iso, iso_to_day
+from .rollups import GRANULARITIES, split_session
+from .storage import (
+    DEFAULT_GLOBAL_TIMING_LIMIT,
+    DEFAULT_TIME_LIMIT,
+    EXPORT_BATCH_SIZE,
+    EXPORT_COLUMNS,
+    PAGE_DATASETS,
+    PAGE_OPERATORS,
+    Storage,
+)
+
+# Case folding of SQLite's LIKE and NOCASE, which only fold ASCII letters
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Store name -> _MemoryTables, shared by every MemoryDB opened with that name
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+class _MemoryTables:  # pylint: disable=too-many-instance-attributes
+    """The tables of one in-memory store, keyed like their SQLite primary keys."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.is_game = {}  # exe_name -> (is_game, user_marked)
+        self.timings = {}  # (exe_name, day) -> duration
+        self.daily_usage = {}  # day -> total_time
+        self.violations = []  # (exe_name, timestamp, reason)
+        self.settings = {}  # key -> value
+        self.timing_settings = {}  # exe_name -> (max_time, notify_limit)
+        self.populated_days = set()
+        self.violation_state = {}  # (exe_name, day) -> (count, first_at, last_at, stage)
+        self.title_matches = {}  # (exe_key, corpus_version) -> (result, match, score)
+        self.sessions = {}  # id -> [exe_name, pid, start_ts, end_ts, closed]
+        self.next_session_id = 1
+        self.rollups = {}  # (granularity, bucket, exe_name) -> seconds
+        self.settings_generation = 0
+        self.settings_listeners = []
+
+
+class MemoryDB(Storage):  # pylint: disable=too-many-public-methods
+    """
+    Storage kept in plain dicts, for tests and benchmarks that should do no
+    disk I/O at all. Instances opened with the same name share their data, the
+    way DB instances share a database file. Nothing survives the process.
+    """
+
+    persistent = False
+
+    def __init__(self, name="fixlife"):
+        super().__init__(f"memory:{name}")
+        with _STORES_LOCK:
+            self._tables = _STORES.setdefault(self.path, _MemoryTables())
+
+    @contextmanager
+    def _write(self):
+        """Hold the store lock for a write, counting it once it succeeded."""
+        with self._tables.lock:
+            yield
+            self._bump_write_generation()
+
+    @staticmethod
+    def get_lock_wait_stats():
+        return {"count": 0, "total_ms": 0.0, "avg_ms": 0.0, "max_ms": 0.0}
+
+    ##### Classification #####
+    def upsert_is_game(self, exe_name, is_game, user_marked=0):
+        t = self._tables
+        with self._write():
+            t.is_game[exe_name] = (int(is_game), int(user_marked))
+            # Games get a default time limit, non games lose theirs
+            if is_game:
+                t.timing_settings.setdefault(exe_name, (DEFAULT_TIME_LIMIT, 0))
+            else:
+                t.timing_settings.pop(exe_name, None)
+        self._bump_settings_generation()
+
+    def upsert_is_game_bulk(self, changes):
+        t = self._tables
+        with self._write():
+            for exe_name, is_game, user_marked in changes:
+                t.is_game[exe_name] = (int(is_game), int(user_marked))
+                if is_game:
+                    t.timing_settings.setdefault(exe_name, (DEFAULT_TIME_LIMIT, 0))
+                else:
+                    t.timing_settings.pop(exe_name, None)
+        self._bump_settings_generation()
+
+    def get_game_names(self):
+        with self._tables.lock:
+            return [exe for exe, (is_game, _) in self._tables.is_game.items() if is_game]
+
+    def get_game_name_set(self):
+        return frozenset(self.get_game_names())
+
+    def get_is_game(self, exe_name):
+        row = self._tables.is_game.get(exe_name)
+        return bool(row[0]) if row else False
+
+    def get_is_present(self, exe_name):
+        return exe_name in self._tables.is_game
+
+    def get_all_processes(self):
+        with self._tables.lock:
+            return [(exe, *row) for exe, row in self._tables.is_game.items()]
+
+    def get_all_classified_processes(self):
+        with self._tables.lock:
+            return list(self._tables.is_game)
+
+    def get_title_matches(self, exe_keys, corpus_version):
+        matches = {}
+        with self._tables.lock:
+            for exe_key in exe_keys:
+                match = self._tables.title_matches.get((exe_key, corpus_version))
+                if match is not None:
+                    matches[exe_key] = match
+        return matches
+
+    def save_title_matches(self, matches, corpus_version):
+        with self._write():
+            for exe_key, match in matches.items():
+                self._tables.title_matches[(exe_key, corpus_version)] = tuple(match)
+
+    ##### Timings #####
+    def update_timing_by_duration(self, exe_name, duration):
+        self.apply_timing_deltas({(day_key(), exe_name): duration})
+
+    def apply_timing_deltas(self, deltas, journal_seq=None, heartbeat=None):
+        t = self._tables
+        with self._write():
+            for (day, exe_name), duration in deltas.items():
+                t.timings[(exe_name, day)] = t.timings.get((exe_name, day), 0) + duration
+                t.daily_usage[day] = t.daily_usage.get(day, 0) + duration
+            if journal_seq is not None:
+                t.settings["timing_journal_seq"] = str(journal_seq)
+            if heartbeat is not None:
+                for session in t.sessions.values():
+                    if not session[4]:
+                        session[3] = heartbeat
+
+    def update_timing_to_a_specific_value(self, exe_name, value):
+        day = day_key()
+        accumulator = self._timing_accumulator()
+        if accumulator:
+            accumulator.discard(exe_name, day)
+        with self._write():
+            self._tables.timings[(exe_name, day)] = value
+            self._tables.daily_usage[day] = value
+
+    def get_timing_for_exe(self, exe_name):
+        day = day_key()
+        stored = self._tables.timings.get((exe_name, day), 0)
+        return stored + self._pending_timings(day).get(exe_name, 0)
+
+    def get_timing_today(self):
+        day = day_key()
+        pending = self._pending_timings(day)
+        date = day_to_iso(day)
+        with self._tables.lock:
+            merged = [
+                (exe_name, duration + pending.pop(exe_name, 0), date)
+                for (exe_name, timing_day), duration in self._tables.timings.items()
+                if timing_day == day
+            ]
+        merged.extend((exe_name, duration, date) for exe_name, duration in pending.items())
+        return merged
+
+    def get_total_time_today(self):
+        day = day_key()
+        with self._tables.lock:
+            total = sum(
+                duration
+                for (_, timing_day), duration in self._tables.timings.items()
+                if timing_day == day
+            )
+        return total + sum(self._pending_timings(day).values())
+
+    def get_daily_timings(self, start_day=None, end_day=None):
+        with self._tables.lock:
+            rows = [
+                (exe_name, day, duration)
+                for (exe_name, day), duration in self._tables.timings.items()
+                if (start_day is None or day >= start_day) and (end_day is None or day <= end_day)
+            ]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return [(exe_name, day_to_iso(day), duration) for exe_name, day, duration in rows]
+
+    ##### Settings #####
+    def get_settings(self, key, default=None):
+        return self._tables.settings.get(key, default)
+
+    def set_settings(self, key, value):
+        with self._write():
+            self._tables.settings[key] = str(value)
+        self._bump_settings_generation()
+
+    def get_settings_generation(self):
+        return self._tables.settings_generation
+
+    def on_settings_change(self, callback):
+        with self._tables.lock:
+            self._tables.settings_listeners.append(callback)
+
+    def _bump_settings_generation(self):
+        with self._tables.lock:
+            self._tables.settings_generation += 1
+            listeners = list(self._tables.settings_listeners)
+        for listener in listeners:
+            listener()
+
+    def get_timing_settings_for_exe(self, exe_name):
+        return self._tables.timing_settings.get(exe_name, (0, 0))
+
+    def set_timing_settings_for_exe(
+        self, exe_name, max_time=DEFAULT_TIME_LIMIT, notify_limit=0, commit=True
+    ):
+        with self._write():
+            if not self.get_is_present(exe_name):
+                raise ValueError(f"Executable '{exe_name}' is not classified as a game.")
+            self._tables.timing_settings[exe_name] = (max_time, notify_limit)
+        self._bump_settings_generation()
+
+    def update_global_timing_settings(self, limit=DEFAULT_GLOBAL_TIMING_LIMIT):
+        self.set_settings("global_timing_limit", limit)
+
+    def update_timing_settings(
+        self, exe_name, max_time=DEFAULT_TIME_LIMIT, notify_limit=DEFAULT_TIME_LIMIT
+    ):
+        with self._write():
+            if not self.get_is_game(exe_name):
+                raise ValueError(f"Executable '{exe_name}' is not classified as a game.")
+            self._tables.timing_settings[exe_name] = (max_time, notify_limit)
+        self._bump_settings_generation()
+
+    def update_timing_settings_bulk(self, changes):
+        rejected = {}
+        with self._write():
+            for exe_name, max_time, notify_limit in changes:
+                if not self.get_is_game(exe_name):
+                    rejected[exe_name] = f"Executable '{exe_name}' is not classified as a game."
+                    continue
+                self._tables.timing_settings[exe_name] = (max_time, notify_limit)
+        self._bump_settings_generation()
+        return rejected
+
+    def refresh_time_limit_list(self):
+        with self._write():
+            for exe_name in self.get_game_names():
+                self._tables.timing_settings.setdefault(exe_name, (DEFAULT_TIME_LIMIT, 0))
+        self._bump_settings_generation()
+
+    def get_all_timing_settings(self):
+        with self._tables.lock:
+            return [(exe, *limits) for exe, limits in self._tables.timing_settings.items()]
+
+    def get_global_timing_limit(self):
+        value = self._tables.settings.get("global_timing_limit")
+        return int(value) if value is not None else 60
+
+    ##### Violations #####
+    def add_violation(self, exe_name, reason):
+        with self._write():
+            self._tables.violations.append((exe_name, datetime.now().isoformat(), reason))
+
+    def record_violation(self, exe_name, reason, kill_threshold):
+        day = day_key()
+        now = datetime.now().isoformat()
+        t = self._tables
+        with self._write():
+            state = t.violation_state.get((exe_name, day))
+            previous_stage = state[3] if state else None
+            warning_count = (state[0] if state else 0) + 1
+            stage = "killed" if warning_count >= kill_threshold else "warning"
+            first_at = state[1] if state else now
+            t.violation_state[(exe_name, day)] = (warning_count, first_at, now, stage)
+            if stage != previous_stage and self._audit_log_enabled():
+                t.violations.append((exe_name, now, reason))
+        return warning_count, stage
+
+    def get_violation_states(self):
+        day = day_key()
+        with self._tables.lock:
+            return {
+                exe_name: state
+                for (exe_name, state_day), state in self._tables.violation_state.items()
+                if state_day == day
+            }
+
+    def get_all_violations(self):
+        day = day_key()
+        if self._audit_log_enabled():
+            since = day_start(day).isoformat()
+            with self._tables.lock:
+                rows = [row for row in self._tables.violations if row[1] >= since]
+            return sorted(rows, key=lambda row: row[1], reverse=True)
+        rows = [
+            (
+                exe_name,
+                last_at,
+                f"Exceeded time limit {count} times. Stage: {stage}",
+            )
+            for exe_name, (count, _, last_at, stage) in self.get_violation_states().items()
+        ]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def get_violation_count_for_exe(self, exe_name):
+        state = self._tables.violation_state.get((exe_name, day_key()))
+        return state[0] if state else 0
+
+    ##### Sessions #####
+    def open_session(self, exe_name, pid, start_ts):
+        with self._write():
+            session_id = self._tables.next_session_id
+            self._tables.next_session_id += 1
+            self._tables.sessions[session_id] = [exe_name, pid, start_ts, start_ts, 0]
+            return session_id
+
+    def close_session(self, session_id, end_ts):
+        with self._write():
+            self._close_session(session_id, end_ts)
+
+    def close_open_sessions(self, end_ts=None):
+        with self._write():
+            for session_id, session in list(self._tables.sessions.items()):
+                if not session[4]:
+                    self._close_session(session_id, session[3] if end_ts is None else end_ts)
+
+    def _close_session(self, session_id, end_ts):
+        session = self._tables.sessions.get(session_id)
+        if session is None or session[4]:
+            return
+        session[3] = max(session[2], end_ts)
+        session[4] = 1
+        self._add_to_rollups(session[0], session[2], session[3])
+
+    def _add_to_rollups(self, exe_name, start_ts, end_ts):
+        rollups = self._tables.rollups
+        for (granularity, bucket), seconds in split_session(start_ts, end_ts).items():
+            key = (granularity, bucket, exe_name)
+            rollups[key] = rollups.get(key, 0) + seconds
+
+    def rebuild_rollups(self):
+        with self._write():
+            self._tables.rollups = {}
+            for exe_name, _, start_ts, end_ts, closed in self._tables.sessions.values():
+                if closed:
+                    self._add_to_rollups(exe_name, start_ts, end_ts)
+
+    def get_usage_history(self, granularity="day", start=None, end=None, exe_name=None):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}'.")
+        with self._tables.lock:
+            rows = [
+                (bucket, exe, seconds)
+                for (row_granularity, bucket, exe), seconds in self._tables.rollups.items()
+                if row_granularity == granularity
+                and (start is None or bucket >= start)
+                and (end is None or bucket <= end)
+                and (exe_name is None or exe == exe_name)
+            ]
+        rows.sort(key=lambda row: (-row[0], row[1]))
+        return rows
+
+    ##### Export / Import #####
+    def iter_export_batches(self, dataset, batch_size=EXPORT_BATCH_SIZE):
+        with self._tables.lock:
+            if dataset == "timings":
+                rows = [
+                    (exe_name, day_to_iso(day), duration)
+                    for (exe_name, day), duration in sorted(
+                        self._tables.timings.items(), key=lambda item: item[0][1]
+                    )
+                ]
+            elif dataset == "violations":
+                rows = sorted(self._tables.violations, key=lambda row: row[1])
+            elif dataset == "sessions":
+                rows = [
+                    tuple(session[:4])
+                    for _, session in sorted(self._tables.sessions.items())
+                    if session[4]
+                ]
+            else:
+                raise ValueError(f"Unknown dataset '{dataset}'.")
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+    def import_batches(self, dataset, batches):
+        if dataset not in EXPORT_COLUMNS:
+            raise ValueError(f"Unknown dataset '{dataset}'.")
+        t = self._tables
+        count = 0
+        for batch in batches:
+            with self._write():
+                if dataset == "timings":
+                    for exe_name, date, duration in batch:
+                        day = iso_to_day(date)
+                        t.timings[(exe_name, day)] = int(duration)
+                    for day in {iso_to_day(row[1]) for row in batch}:
+                        t.daily_usage[day] = sum(
+                            duration
+                            for (_, timing_day), duration in t.timings.items()
+                            if timing_day == day
+                        )
+                elif dataset == "violations":
+                    known = {(row[0], row[1]) for row in t.violations}
+                    for exe_name, timestamp, reason in batch:
+                        if (exe_name, timestamp) not in known:
+                            known.add((exe_name, timestamp))
+                            t.violations.append((exe_name, timestamp, reason))
+                else:
+                    known = {(s[0], s[2]) for s in t.sessions.values()}
+                    for exe_name, pid, start_ts, end_ts in batch:
+                        start_ts, end_ts = float(start_ts), float(end_ts)
+                        if (exe_name, start_ts) in known:
+                            continue
+                        known.add((exe_name, start_ts))
+                        t.sessions[t.next_session_id] = [exe_name, pid, start_ts, end_ts, 1]
+                        t.next_session_id += 1
+            count += len(batch)
+        if dataset == "sessions" and count:
+            self.rebuild_rollups()
+        return count
+
+    ##### Pages #####
+    def _select_page(self, dataset, conditions, order, descending, after, limit):
+        t = self._tables
+        with t.lock:
+            if dataset == "timings":
+                rows = [(exe, day, duration) for (exe, day), duration in t.timings.items()]
+            elif dataset == "history":
+                rows = [(*key, seconds) for key, seconds in t.rollups.items()]
+            elif dataset == "violations":
+                rows = [(i + 1, *row) for i, row in enumerate(t.violations)]
+            else:
+                rows = [
+                    (exe, *row, *t.timing_settings.get(exe, (None, None)))
+                    for exe, row in t.is_game.items()
+                ]
+        columns = PAGE_DATASETS[dataset][0]
+        checks = [
+            (columns.index(column), PAGE_OPERATORS[op], value) for column, op, value in conditions
+        ]
+        positions = [columns.index(column) for column in order]
+
+        def sort_key(row):
+            return tuple(row[i] for i in positions)
+
+        rows = [row for row in rows if all(op(row[i], value) for i, op, value in checks)]
+        if after is not None:
+            beyond = operator.lt if descending else operator.gt
+            rows = [row for row in rows if beyond(sort_key(row), after)]
+        rows.sort(key=sort_key, reverse=descending)
+        return rows[:limit]
+
+    def _search_processes(self, query, prefix, after, limit):
+        query = query.translate(_ASCII_LOWER)
+
+        def sort_key(row):
+            return (-row[1], row[0].translate(_ASCII_LOWER), row[0])
+
+        with self._tables.lock:
+            rows = [(exe, *row) for exe, row in self._tables.is_game.items()]
+        if query:
+            rows = [
+                row
+                for row in rows
+                if (
+                    row[0].translate(_ASCII_LOWER).startswith(query)
+                    if prefix
+                    else query in row[0].translate(_ASCII_LOWER)
+                )
+            ]
+        if after is not None:
+            start = sort_key((after[1], after[0]))
+            rows = [row for row in rows if sort_key(row) > start]
+        rows.sort(key=sort_key)
+        return rows[:limit]
+
+    ##### Miscellaneous Methods #####
+    def get_is_data_populated_today(self):
+        return day_key() in self._tables.populated_days
+
+    def populate_data_today(self, day=None):
+        day = day_key() if day is None else day
+        with self._write():
+            for exe_name in self.get_game_names():
+                self._tables.timings.setdefault((exe_name, day), 0)
+            self._tables.populated_days.add(day)
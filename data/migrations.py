@@ -0,0 +1,351 @@
+"""
+Numbered schema migrations for the tracker database.
+
+Every migration runs exactly once per database, inside its own transaction, and
+is recorded in the `schema_version` table. To change the schema append a new
+(version, description, function) entry to MIGRATIONS, never edit an old one.
+"""
+
+import sqlite3
+from datetime import datetime
+
+from log_utils import get_logger
+
+logger = get_logger("migrations", "tracker.log")
+
+
+def _initial_schema(c):
+    """Tables as they existed before versioned migrations."""
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS is_game (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        exe_name TEXT UNIQUE,
+        is_game INTEGER DEFAULT 0,
+        user_marked INTEGER DEFAULT 0
+    )"""
+    )
+
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS timings (
+        exe_name TEXT,
+        date TEXT,
+        duration INTEGER DEFAULT 0,
+        PRIMARY KEY (exe_name, date)
+    )"""
+    )
+
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS violations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        exe_name TEXT,
+        timestamp TEXT,
+        reason TEXT
+    )"""
+    )
+
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )"""
+    )
+
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS daily_usage (
+        date TEXT PRIMARY KEY,
+        total_time INTEGER DEFAULT 0
+    )"""
+    )
+
+    # Timing settings
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS timing_settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        exe_name TEXT UNIQUE,
+        max_time INTEGER DEFAULT 0,
+        notify_limit INTEGER DEFAULT 0
+    )"""
+    )
+
+    # Check if is_data_populated_today table exists, if not create it
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS is_data_populated_today (
+            date TEXT PRIMARY KEY,
+            is_populated INTEGER
+        )
+    """
+    )
+
+    # One row per exe and day, updated in place on every violation.
+    # The violations table above is the append-only audit log of
+    # stage transitions.
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS violation_state (
+            exe_name TEXT,
+            date TEXT,
+            warning_count INTEGER DEFAULT 0,
+            first_at TEXT,
+            last_at TEXT,
+            stage TEXT,
+            PRIMARY KEY (exe_name, date)
+        )
+    """
+    )
+
+    # Memoized fuzzy title matches, keyed by title corpus version
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS title_match_cache (
+            exe_key TEXT,
+            corpus_version TEXT,
+            result TEXT,
+            match TEXT,
+            score REAL,
+            PRIMARY KEY (exe_key, corpus_version)
+        )
+    """
+    )
+
+
+def _add_indexes(c):
+    """Indexes for the lookups the tracker and dashboard run all the time."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_timings_date ON timings (date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_violations_exe_name ON violations (exe_name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations (timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_is_game_is_game ON is_game (is_game, exe_name)")
+
+
+# ISO 'YYYY-MM-DD' text -> days since 1970-01-01
+_ISO_TO_DAY = "CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+
+
+def _rebuild_table(c, table, create_sql, columns, select_sql):
+    """
+    Rebuild a table with a new definition inside the running transaction.
+    Readers keep seeing the old table (WAL) until the migration commits.
+    """
+    c.execute(f"DROP TABLE IF EXISTS {table}_new")
+    c.execute(create_sql.format(table=f"{table}_new"))
+    c.execute(f"INSERT INTO {table}_new ({columns}) {select_sql}")
+    c.execute(f"DROP TABLE {table}")
+    c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+def _integer_day_keys(c):
+    """Store days as integer epoch-days instead of ISO date text."""
+    iso_to_day = _ISO_TO_DAY.format(column="date")
+    _rebuild_table(
+        c,
+        "timings",
+        """CREATE TABLE {table} (
+            exe_name TEXT,
+            day INTEGER,
+            duration INTEGER DEFAULT 0,
+            PRIMARY KEY (exe_name, day)
+        )""",
+        "exe_name, day, duration",
+        f"SELECT exe_name, {iso_to_day}, duration FROM timings",
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_timings_day ON timings (day)")
+
+    _rebuild_table(
+        c,
+        "daily_usage",
+        """CREATE TABLE {table} (
+            day INTEGER PRIMARY KEY,
+            total_time INTEGER DEFAULT 0
+        )""",
+        "day, total_time",
+        f"SELECT {iso_to_day}, total_time FROM daily_usage",
+    )
+
+    _rebuild_table(
+        c,
+        "is_data_populated_today",
+        """CREATE TABLE {table} (
+            day INTEGER PRIMARY KEY,
+            is_populated INTEGER
+        )""",
+        "day, is_populated",
+        f"SELECT {iso_to_day}, is_populated FROM is_data_populated_today",
+    )
+
+    _rebuild_table(
+        c,
+        "violation_state",
+        """CREATE TABLE {table} (
+            exe_name TEXT,
+            day INTEGER,
+            warning_count INTEGER DEFAULT 0,
+            first_at TEXT,
+            last_at TEXT,
+            stage TEXT,
+            PRIMARY KEY (exe_name, day)
+        )""",
+        "exe_name, day, warning_count, first_at, last_at, stage",
+        f"SELECT exe_name, {iso_to_day}, warning_count, first_at, last_at, stage "
+        "FROM violation_state",
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_violation_state_day ON violation_state (day)")
+
+
+def _sessions_and_rollups(c):
+    """Append-only session log plus incrementally maintained usage rollups."""
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        exe_name TEXT,
+        pid INTEGER,
+        start_ts REAL,
+        end_ts REAL,
+        closed INTEGER DEFAULT 0
+    )"""
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_open ON sessions (closed)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_ts)")
+
+    # granularity is one of hour/day/week/month, see data/rollups.py for buckets
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS usage_rollups (
+        granularity TEXT,
+        bucket INTEGER,
+        exe_name TEXT,
+        seconds INTEGER DEFAULT 0,
+        PRIMARY KEY (granularity, bucket, exe_name)
+    )"""
+    )
+
+
+def _archive_manifest(c):
+    """Index of the compressed archive files written by data.archive."""
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS archives (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT,
+        first_day INTEGER,
+        last_day INTEGER,
+        path TEXT,
+        row_count INTEGER,
+        created_at TEXT
+    )"""
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archives_range ON archives (table_name, last_day)"
+    )
+
+
+def _process_search(c):
+    """Indexes behind the settings page's paged, searchable process list."""
+    # Games first, then by name, in the order the page lists them
+    c.execute(
+        """CREATE INDEX IF NOT EXISTS idx_is_game_browse
+        ON is_game (is_game DESC, exe_name COLLATE NOCASE, exe_name)"""
+    )
+    try:
+        c.execute(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS is_game_search USING fts5(
+            exe_name, content='is_game', content_rowid='id', tokenize='trigram'
+        )"""
+        )
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5 or older than 3.34, searches scan instead
+        logger.warning(f"No substring index for process search: {e}")
+        return
+    c.execute("INSERT INTO is_game_search (is_game_search) VALUES ('rebuild')")
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS is_game_search_insert AFTER INSERT ON is_game BEGIN
+        INSERT INTO is_game_search (rowid, exe_name) VALUES (new.id, new.exe_name);
+    END"""
+    )
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS is_game_search_delete AFTER DELETE ON is_game BEGIN
+        INSERT INTO is_game_search (is_game_search, rowid, exe_name)
+        VALUES ('delete', old.id, old.exe_name);
+    END"""
+    )
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS is_game_search_update
+        AFTER UPDATE OF exe_name ON is_game BEGIN
+        INSERT INTO is_game_search (is_game_search, rowid, exe_name)
+        VALUES ('delete', old.id, old.exe_name);
+        INSERT INTO is_game_search (rowid, exe_name) VALUES (new.id, new.exe_name);
+    END"""
+    )
+
+
+def _incremental_auto_vacuum(c):
+    """
+    Let compaction hand freed pages back with PRAGMA incremental_vacuum.
+    Switching an existing database needs one VACUUM, which cannot run inside
+    a transaction, so migrate() runs this one before opening it.
+    """
+    if c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        c.execute("VACUUM")
+
+
+_incremental_auto_vacuum.outside_transaction = True
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "indexes on timings, violations and is_game", _add_indexes),
+    (3, "integer epoch-day keys", _integer_day_keys),
+    (4, "session log and usage rollups", _sessions_and_rollups),
+    (5, "archive manifest", _archive_manifest),
+    (6, "process search indexes", _process_search),
+    (7, "incremental auto vacuum", _incremental_auto_vacuum),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )"""
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def get_schema_version_readonly(conn):
+    """Schema version of a database opened read-only, 0 if it was never migrated."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+
+
+def migrate(conn):
+    """Apply every pending migration. Returns the resulting schema version."""
+    current = get_schema_version(conn)
+    conn.commit()
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying schema migration {version}: {description}")
+        try:
+            if getattr(migration, "outside_transaction", False):
+                migration(conn.cursor())
+                conn.execute("BEGIN IMMEDIATE")
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+                migration(conn.cursor())
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+    return current
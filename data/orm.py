@@ -1,10 +1,48 @@
+import operator
 import os
 import sqlite3
 import threading
+import time
+import weakref
+from contextlib import contextmanager
+from itertools import islice
+from types import MappingProxyType
 from datetime import datetime
 
 from dotenv import load_dotenv
 
+from .archive import (
+    ARCHIVE_SPAN_DAYS,
+    ARCHIVED_TABLES,
+    day_bound,
+    read_archive,
+    row_day,
+    write_archive,
+)
+from .days import day_key, day_start, day_to_iso, iso_to_day
+from .migrations import (
+    SCHEMA_VERSION,
+    get_schema_version,
+    get_schema_version_readonly,
+    migrate,
+)
+from .rollups import (
+    GRANULARITIES,
+    hour_bucket,
+    month_bucket,
+    split_session,
+    week_bucket,
+)
+from .storage import (
+    DEFAULT_GLOBAL_TIMING_LIMIT,
+    DEFAULT_TIME_LIMIT,
+    EXPORT_BATCH_SIZE,
+    EXPORT_COLUMNS,
+    PAGE_DATASETS,
+    PAGE_OPERATORS,
+    Storage,
+)
+
 load_dotenv()
 
 ENV = os.getenv("ENV", "production").lower()
@@ -18,93 +56,239 @@ if ENV == "development":
     CURRENT_DIR = os.path.dirname(__file__)
     DB_PATH = os.path.join(CURRENT_DIR, "game_tracker.db")
 
+# Serializes writers only. Readers use their own connection and run in
+# parallel thanks to WAL mode.
 _LOCK = threading.Lock()
 
-DEFAULT_TIME_LIMIT = 60  # Default time limit for games in minutes
-DEFAULT_GLOBAL_TIMING_LIMIT = 60  # Default global timing limit in minutes
+# Per-thread connections: thread -> _ThreadConnections
+_LOCAL = threading.local()
 
+# Connections of finished threads: DB path -> [sqlite3.Connection]. Werkzeug
+# serves every request on a new thread, new threads take a connection from here
+# instead of opening (and preparing statements on) a fresh one.
+_IDLE_CONNECTIONS = {}
+_IDLE_CONNECTIONS_LOCK = threading.Lock()
+MAX_IDLE_CONNECTIONS = 8  # per DB path, extra ones are closed
 
-class DB:  # pylint: disable=too-many-public-methods
-    def __init__(self, path=DB_PATH):
-        self.path = path
-        self._ensure_db()
+# How long writers waited for _LOCK. Only updated while holding _LOCK.
+_LOCK_WAIT_STATS = {"count": 0, "total": 0.0, "max": 0.0}
 
-    def _connect(self):
-        return sqlite3.connect(self.path, check_same_thread=False)
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL, avoids an fsync per commit
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",  # 8 MB page cache per connection
+)
+STATEMENT_CACHE_SIZE = 256
 
-    def _ensure_db(self):
-        """Create tables if not exists."""
-        # Create the directory if it doesn't exist
-        if not os.path.exists(DB_DIR):
-            os.makedirs(DB_DIR, exist_ok=True)
-        # Create the database and tables
-        with self._connect() as conn:
-            c = conn.cursor()
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS is_game (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                exe_name TEXT UNIQUE,
-                is_game INTEGER DEFAULT 0,
-                user_marked INTEGER DEFAULT 0
-            )"""
-            )
+# Online backups copy this many pages per step and pause in between
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005  # seconds
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS timings (
-                exe_name TEXT,
-                date TEXT,
-                duration INTEGER DEFAULT 0,
-                PRIMARY KEY (exe_name, date)
-            )"""
-            )
+# Shared-cache in-memory database, see DB
+MEMORY_DB_URI = "file:{name}?mode=memory&cache=shared"
+MEMORY_CONNECTION_PRAGMAS = (
+    # Shared cache locks whole tables, let readers see uncommitted rows
+    # instead of failing with "database table is locked" during a write
+    "PRAGMA read_uncommitted=1",
+    "PRAGMA temp_store=MEMORY",
+)
+# In-memory DB URI -> connection that keeps the database alive
+_MEMORY_ANCHORS = {}
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS violations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                exe_name TEXT,
-                timestamp TEXT,
-                reason TEXT
-            )"""
-            )
+# DB paths whose schema is already up to date in this process
+_MIGRATED_PATHS = set()
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )"""
-            )
+# DB path -> frozenset of exe names classified as games. Shared by every DB
+# instance in the process and dropped whenever is_game is written.
+_GAME_NAMES_CACHE = {}
+_GAME_NAMES_GENERATION = {}
+_GAME_NAMES_LOCK = threading.Lock()
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS daily_usage (
-                date TEXT PRIMARY KEY,
-                total_time INTEGER DEFAULT 0
-            )"""
-            )
+# DB path -> SettingsSnapshot of the settings and timing_settings tables.
+# Every write path bumps the generation, drops the snapshot and calls the
+# listeners registered with DB.on_settings_change.
+_SETTINGS_CACHE = {}
+_SETTINGS_GENERATION = {}
+_SETTINGS_LISTENERS = {}
+_SETTINGS_LOCK = threading.Lock()
 
-            # Timing settings
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS timing_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                exe_name TEXT UNIQUE,
-                max_time INTEGER DEFAULT 0,
-                notify_limit INTEGER DEFAULT 0
-            )"""
-            )
+# Bookkeeping written on every timing flush, always read from the DB
+_UNCACHED_SETTINGS = frozenset({"timing_journal_seq"})
 
-            # Check if is_data_populated_today table exists, if not create it
-            c.execute(
-                """
-                CREATE TABLE IF NOT EXISTS is_data_populated_today (
-                    date TEXT PRIMARY KEY,
-                    is_populated INTEGER
-                )
-            """
+# DB path -> [connection that never writes, last PRAGMA data_version it saw].
+# data_version changes whenever another connection commits, including
+# connections in other processes.
+_VERSION_PROBES = {}
+_VERSION_PROBES_LOCK = threading.Lock()
+
+# DB path -> whether the is_game_search substring index exists, see migration 6
+_SEARCH_INDEXED = {}
+
+# Table (or subquery) each get_page dataset is read from
+_PAGE_SOURCES = {
+    "timings": "timings",
+    "history": "usage_rollups",
+    "violations": "violations",
+    "processes": """(
+        SELECT g.exe_name, g.is_game, g.user_marked, s.max_time, s.notify_limit
+        FROM is_game g LEFT JOIN timing_settings s ON s.exe_name = g.exe_name
+    )""",
+}
+
+
+class _ThreadConnections:
+    """One thread's connections, parked for reuse once the thread is gone."""
+
+    __slots__ = ("by_path", "__weakref__")
+
+    def __init__(self):
+        self.by_path = {}
+        weakref.finalize(self, _park_connections, self.by_path)
+
+
+def _park_connections(connections):
+    surplus = []
+    with _IDLE_CONNECTIONS_LOCK:
+        for path, conn in connections.items():
+            idle = _IDLE_CONNECTIONS.setdefault(path, [])
+            if len(idle) < MAX_IDLE_CONNECTIONS:
+                idle.append(conn)
+            else:
+                surplus.append(conn)
+    for conn in surplus:
+        conn.close()
+
+
+class SettingsSnapshot:
+    """Immutable view of the settings tables at one settings generation."""
+
+    __slots__ = ("generation", "values", "timing_settings", "timing_rows")
+
+    def __init__(self, generation, values, timing_rows):
+        self.generation = generation
+        self.values = MappingProxyType(dict(values))
+        self.timing_rows = tuple(timing_rows)
+        self.timing_settings = MappingProxyType(
+            {row[0]: (row[1], row[2]) for row in self.timing_rows}
+        )
+
+
+class DB(Storage):  # pylint: disable=too-many-public-methods
+    """
+    SQLite storage. `path` is a database file, or ":memory:" / a
+    "file:...?mode=memory" URI for a database that lives only in this process.
+    In-memory databases use SQLite's shared cache so every thread sees the
+    same data.
+    """
+
+    def __init__(self, path=DB_PATH):
+        if path == ":memory:":
+            path = MEMORY_DB_URI.format(name="fixlife")
+        super().__init__(path)
+        self.persistent = "mode=memory" not in path
+        self._ensure_db()
+
+    def _connect(self):
+        """
+        Return this thread's connection to the DB. On first use it takes a
+        connection left by a finished thread, or opens one. Connections stay
+        open, so sqlite3's statement cache keeps prepared statements around
+        between calls.
+        """
+        connections = getattr(_LOCAL, "connections", None)
+        if connections is None:
+            connections = _LOCAL.connections = _ThreadConnections()
+        conn = connections.by_path.get(self.path)
+        if conn is not None:
+            return conn
+        with _IDLE_CONNECTIONS_LOCK:
+            idle = _IDLE_CONNECTIONS.get(self.path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE,
+                uri=self.path.startswith("file:"),
             )
+            pragmas = CONNECTION_PRAGMAS if self.persistent else MEMORY_CONNECTION_PRAGMAS
+            for pragma in pragmas:
+                conn.execute(pragma)
+        connections.by_path[self.path] = conn
+        return conn
 
-            conn.commit()
+    @contextmanager
+    def _write(self):
+        """Take the write lock and yield a connection, committing on success."""
+        wait_started = time.perf_counter()
+        with _LOCK:
+            waited = time.perf_counter() - wait_started
+            _LOCK_WAIT_STATS["count"] += 1
+            _LOCK_WAIT_STATS["total"] += waited
+            _LOCK_WAIT_STATS["max"] = max(_LOCK_WAIT_STATS["max"], waited)
+            with self._connect() as conn:
+                yield conn
+            self._bump_write_generation()
+
+    def get_write_generation(self):
+        """
+        Counter bumped by every committed write. For file databases commits
+        made by other processes count too, they are noticed on the next call.
+        """
+        if self.persistent:
+            self._observe_external_writes()
+        return super().get_write_generation()
+
+    def _observe_external_writes(self):
+        with _VERSION_PROBES_LOCK:
+            probe = _VERSION_PROBES.get(self.path)
+            if probe is None:
+                probe = _VERSION_PROBES[self.path] = [
+                    sqlite3.connect(self.path, check_same_thread=False),
+                    None,
+                ]
+            version = probe[0].execute("PRAGMA data_version").fetchone()[0]
+            changed = probe[1] is not None and version != probe[1]
+            probe[1] = version
+        if changed:
+            with _LOCK:
+                self._bump_write_generation()
+
+    @staticmethod
+    def get_lock_wait_stats():
+        """
+        Return how long writers have waited for the write lock, in milliseconds.
+        """
+        count = _LOCK_WAIT_STATS["count"]
+        total = _LOCK_WAIT_STATS["total"]
+        return {
+            "count": count,
+            "total_ms": round(total * 1000, 3),
+            "avg_ms": round(total * 1000 / count, 3) if count else 0.0,
+            "max_ms": round(_LOCK_WAIT_STATS["max"] * 1000, 3),
+        }
+
+    def _ensure_db(self):
+        """Create or upgrade the schema, once per DB path and process."""
+        if self.path in _MIGRATED_PATHS:
+            return
+        # Create the directory if it doesn't exist
+        if self.persistent and not os.path.exists(DB_DIR):
+            os.makedirs(DB_DIR, exist_ok=True)
+        with _LOCK:
+            if self.path in _MIGRATED_PATHS:
+                return
+            conn = self._connect()
+            if not self.persistent:
+                _MEMORY_ANCHORS[self.path] = conn
+            if get_schema_version(conn) < SCHEMA_VERSION:
+                migrate(conn)
+            _MIGRATED_PATHS.add(self.path)
 
     def upsert_is_game(self, exe_name, is_game, user_marked=0):
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             conn.execute(
                 """
                 INSERT INTO is_game (exe_name, is_game, user_marked)
@@ -133,111 +317,240 @@ class DB:  # pylint: disable=too-many-public-methods
                     (exe_name,),
                 )
             conn.commit()
+            with _GAME_NAMES_LOCK:
+                _GAME_NAMES_GENERATION[self.path] = (
+                    _GAME_NAMES_GENERATION.get(self.path, 0) + 1
+                )
+                _GAME_NAMES_CACHE.pop(self.path, None)
+        self._bump_settings_generation()  # timing_settings rows were added or removed
+
+    def upsert_is_game_bulk(self, changes):
+        """
+        Classify many executables in one transaction. `changes` holds
+        (exe_name, is_game, user_marked) tuples, same effect as calling
+        upsert_is_game for each of them.
+        """
+        # One change per exe, the last one wins like sequential upserts would.
+        # Otherwise the timing_settings inserts and deletes below disagree.
+        changes = list(
+            {
+                exe_name: (exe_name, int(is_game), int(user_marked))
+                for exe_name, is_game, user_marked in changes
+            }.values()
+        )
+        if not changes:
+            return
+        with self._write() as conn:
+            conn.executemany(
+                """
+                INSERT INTO is_game (exe_name, is_game, user_marked)
+                VALUES (?, ?, ?)
+                ON CONFLICT(exe_name) DO UPDATE SET
+                is_game=excluded.is_game, user_marked=excluded.user_marked
+            """,
+                changes,
+            )
+            conn.executemany(
+                """
+                INSERT INTO timing_settings (exe_name, max_time, notify_limit)
+                VALUES (?, 60, 0)
+                ON CONFLICT(exe_name) DO NOTHING
+            """,
+                [(exe_name,) for exe_name, is_game, _ in changes if is_game],
+            )
+            conn.executemany(
+                "DELETE FROM timing_settings WHERE exe_name = ?",
+                [(exe_name,) for exe_name, is_game, _ in changes if not is_game],
+            )
+            conn.commit()
+            with _GAME_NAMES_LOCK:
+                _GAME_NAMES_GENERATION[self.path] = (
+                    _GAME_NAMES_GENERATION.get(self.path, 0) + 1
+                )
+                _GAME_NAMES_CACHE.pop(self.path, None)
+        self._bump_settings_generation()
 
     def get_game_names(self):
-        with _LOCK, self._connect() as conn:
+        with self._connect() as conn:
             rows = conn.execute(
                 "SELECT exe_name FROM is_game WHERE is_game = 1"
             ).fetchall()
             return [row[0] for row in rows]
 
+    def get_game_name_set(self):
+        """
+        Return the set of exe names classified as games.
+        Served from memory until the next write to the is_game table.
+        """
+        game_names = _GAME_NAMES_CACHE.get(self.path)
+        if game_names is not None:
+            return game_names
+        generation = _GAME_NAMES_GENERATION.get(self.path, 0)
+        game_names = frozenset(self.get_game_names())
+        # Only cache if no write happened while we were reading
+        with _GAME_NAMES_LOCK:
+            if _GAME_NAMES_GENERATION.get(self.path, 0) == generation:
+                _GAME_NAMES_CACHE[self.path] = game_names
+        return game_names
+
     def get_is_game(self, exe_name):
-        with _LOCK, self._connect() as conn:
+        with self._connect() as conn:
             row = conn.execute(
                 "SELECT is_game FROM is_game WHERE exe_name = ?", (exe_name,)
             ).fetchone()
             return bool(row[0]) if row else False
 
     def get_is_present(self, exe_name):
-        with _LOCK, self._connect() as conn:
+        with self._connect() as conn:
             row = conn.execute(
                 "SELECT exe_name FROM is_game WHERE exe_name = ?", (exe_name,)
             ).fetchone()
             return row is not None
 
     def update_timing_by_duration(self, exe_name, duration):
-        date = datetime.now().date().isoformat()
-        with _LOCK, self._connect() as conn:
+        day = day_key()
+        with self._write() as conn:
             conn.execute(
                 """
-                INSERT INTO timings (exe_name, date, duration)
+                INSERT INTO timings (exe_name, day, duration)
                 VALUES (?, ?, ?)
-                ON CONFLICT(exe_name, date) DO UPDATE SET
+                ON CONFLICT(exe_name, day) DO UPDATE SET
                 duration = duration + excluded.duration
             """,
-                (exe_name, date, duration),
+                (exe_name, day, duration),
             )
             conn.execute(
                 """
-                INSERT INTO daily_usage (date, total_time)
+                INSERT INTO daily_usage (day, total_time)
                 VALUES (?, ?)
-                ON CONFLICT(date) DO UPDATE SET
+                ON CONFLICT(day) DO UPDATE SET
                 total_time = total_time + excluded.total_time
             """,
-                (date, duration),
+                (day, duration),
             )
             conn.commit()
 
+    def apply_timing_deltas(self, deltas, journal_seq=None, heartbeat=None):
+        """
+        Add buffered durations to timings and daily_usage in one transaction.
+        `deltas` maps (day, exe_name) to seconds. `journal_seq` records the last
+        journal entry covered by this write so it is not replayed after a crash.
+        `heartbeat` (a timestamp) moves the end of every open session forward, so
+        sessions cut off by a crash can be closed at their last known time.
+        """
+        daily_totals = {}
+        for (day, _), duration in deltas.items():
+            daily_totals[day] = daily_totals.get(day, 0) + duration
+
+        with self._write() as conn:
+            conn.executemany(
+                """
+                INSERT INTO timings (exe_name, day, duration)
+                VALUES (?, ?, ?)
+                ON CONFLICT(exe_name, day) DO UPDATE SET
+                duration = duration + excluded.duration
+            """,
+                [(exe_name, day, duration) for (day, exe_name), duration in deltas.items()],
+            )
+            conn.executemany(
+                """
+                INSERT INTO daily_usage (day, total_time)
+                VALUES (?, ?)
+                ON CONFLICT(day) DO UPDATE SET
+                total_time = total_time + excluded.total_time
+            """,
+                list(daily_totals.items()),
+            )
+            if journal_seq is not None:
+                conn.execute(
+                    """
+                    INSERT INTO settings (key, value)
+                    VALUES ('timing_journal_seq', ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                    (str(journal_seq),),
+                )
+            if heartbeat is not None:
+                conn.execute(
+                    "UPDATE sessions SET end_ts = ? WHERE closed = 0", (heartbeat,)
+                )
+            conn.commit()
+
     def update_timing_to_a_specific_value(self, exe_name, value):
-        date = datetime.now().date().isoformat()
-        with _LOCK, self._connect() as conn:
+        day = day_key()
+        accumulator = self._timing_accumulator()
+        if accumulator:
+            accumulator.discard(exe_name, day)
+        with self._write() as conn:
             conn.execute(
                 """
-                INSERT INTO timings (exe_name, date, duration)
+                INSERT INTO timings (exe_name, day, duration)
                 VALUES (?, ?, ?)
-                ON CONFLICT(exe_name, date) DO UPDATE SET
+                ON CONFLICT(exe_name, day) DO UPDATE SET
                 duration = excluded.duration
             """,
-                (exe_name, date, value),
+                (exe_name, day, value),
             )
             conn.execute(
                 """
-                INSERT INTO daily_usage (date, total_time)
+                INSERT INTO daily_usage (day, total_time)
                 VALUES (?, ?)
-                ON CONFLICT(date) DO UPDATE SET
+                ON CONFLICT(day) DO UPDATE SET
                 total_time = excluded.total_time
             """,
-                (date, value),
+                (day, value),
             )
             conn.commit()
 
     def get_timing_for_exe(self, exe_name):
-        date = datetime.now().date().isoformat()
-        with _LOCK, self._connect() as conn:
+        day = day_key()
+        with self._connect() as conn:
             row = conn.execute(
                 """
-                SELECT duration FROM timings WHERE exe_name = ? AND date = ?
+                SELECT duration FROM timings WHERE exe_name = ? AND day = ?
             """,
-                (exe_name, date),
+                (exe_name, day),
             ).fetchone()
-            return row[0] if row else 0
+        pending = self._pending_timings(day).get(exe_name, 0)
+        return (row[0] if row else 0) + pending
 
     def get_timing_today(self):
-        date = datetime.now().date().isoformat()
-        with _LOCK, self._connect() as conn:
+        day = day_key()
+        with self._connect() as conn:
             row = conn.execute(
                 """
-                SELECT exe_name, duration, date FROM timings WHERE date = ?
+                SELECT exe_name, duration FROM timings WHERE day = ?
             """,
-                (date,),
+                (day,),
             ).fetchall()
-            return row
+        pending = self._pending_timings(day)
+        date = day_to_iso(day)
+        merged = [
+            (exe_name, duration + pending.pop(exe_name, 0), date)
+            for exe_name, duration in row
+        ]
+        merged.extend(
+            (exe_name, duration, date) for exe_name, duration in pending.items()
+        )
+        return merged
 
     def get_total_time_today(self):
-        date = datetime.now().date().isoformat()
-        with _LOCK, self._connect() as conn:
+        day = day_key()
+        with self._connect() as conn:
             # Use timings table to get total time for today
             row = conn.execute(
                 """
-                SELECT SUM(duration) FROM timings WHERE date = ?
+                SELECT SUM(duration) FROM timings WHERE day = ?
             """,
-                (date,),
+                (day,),
             ).fetchone()
-            return row[0] if row else 0
+        pending = sum(self._pending_timings(day).values())
+        total = row[0] if row else 0
+        return (total or 0) + pending if pending else total
 
     def add_violation(self, exe_name, reason):
         now = datetime.now().isoformat()
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             conn.execute(
                 """
                 INSERT INTO violations (exe_name, timestamp, reason)
@@ -248,14 +561,16 @@ class DB:  # pylint: disable=too-many-public-methods
             conn.commit()
 
     def get_settings(self, key, default=None):
-        with _LOCK, self._connect() as conn:
-            row = conn.execute(
-                "SELECT value FROM settings WHERE key = ?", (key,)
-            ).fetchone()
-            return row[0] if row else default
+        if key in _UNCACHED_SETTINGS:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM settings WHERE key = ?", (key,)
+                ).fetchone()
+                return row[0] if row else default
+        return self._settings_snapshot().values.get(key, default)
 
     def set_settings(self, key, value):
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             conn.execute(
                 """
                 INSERT INTO settings (key, value)
@@ -265,37 +580,89 @@ class DB:  # pylint: disable=too-many-public-methods
                 (key, value),
             )
             conn.commit()
+        if key not in _UNCACHED_SETTINGS:
+            self._bump_settings_generation()
 
     def get_all_processes(self):
-        with _LOCK, self._connect() as conn:
+        with self._connect() as conn:
             return conn.execute(
                 "SELECT exe_name, is_game, user_marked FROM is_game"
             ).fetchall()
 
     def get_all_classified_processes(self):
-        with _LOCK, self._connect() as conn:
+        with self._connect() as conn:
             cur = conn.execute("SELECT exe_name FROM is_game")
             return [row[0] for row in cur.fetchall()]
 
-    def get_daily_timings(self):
-        with _LOCK, self._connect() as conn:
-            return conn.execute(
-                "SELECT exe_name, date, duration FROM timings ORDER BY date DESC"
-            ).fetchall()
+    def get_daily_timings(self, start_day=None, end_day=None):
+        """
+        Return (exe_name, date, duration) rows, newest first. Days before the
+        retention horizon are read from the archive files covering the range.
+        """
+        query = "SELECT exe_name, day, duration FROM timings WHERE 1 = 1"
+        params = []
+        if start_day is not None:
+            query += " AND day >= ?"
+            params.append(start_day)
+        if end_day is not None:
+            query += " AND day <= ?"
+            params.append(end_day)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        rows.extend(self._iter_archived("timings", start_day, end_day))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return [(exe_name, day_to_iso(day), duration) for exe_name, day, duration in rows]
 
     ###### Settings ######
+    def _settings_snapshot(self):
+        """
+        Return the current SettingsSnapshot, reading both settings tables only
+        after a settings write.
+        """
+        snapshot = _SETTINGS_CACHE.get(self.path)
+        if snapshot is not None:
+            return snapshot
+        generation = _SETTINGS_GENERATION.get(self.path, 0)
+        with self._connect() as conn:
+            values = conn.execute("SELECT key, value FROM settings").fetchall()
+            timing_rows = conn.execute(
+                "SELECT exe_name, max_time, notify_limit FROM timing_settings"
+            ).fetchall()
+        snapshot = SettingsSnapshot(
+            generation,
+            ((key, value) for key, value in values if key not in _UNCACHED_SETTINGS),
+            timing_rows,
+        )
+        # Only cache if no write happened while we were reading
+        with _SETTINGS_LOCK:
+            if _SETTINGS_GENERATION.get(self.path, 0) == generation:
+                _SETTINGS_CACHE[self.path] = snapshot
+        return snapshot
+
+    def _bump_settings_generation(self):
+        with _SETTINGS_LOCK:
+            _SETTINGS_GENERATION[self.path] = _SETTINGS_GENERATION.get(self.path, 0) + 1
+            _SETTINGS_CACHE.pop(self.path, None)
+            listeners = list(_SETTINGS_LISTENERS.get(self.path, ()))
+        for listener in listeners:
+            listener()
+
+    def get_settings_generation(self):
+        """Counter bumped by every write to settings or timing_settings."""
+        return _SETTINGS_GENERATION.get(self.path, 0)
+
+    def on_settings_change(self, callback):
+        """Call `callback()` after every settings write to this DB, from any DB instance."""
+        with _SETTINGS_LOCK:
+            _SETTINGS_LISTENERS.setdefault(self.path, []).append(callback)
+
     def get_timing_settings_for_exe(self, exe_name):
-        with _LOCK, self._connect() as conn:
-            row = conn.execute(
-                "SELECT max_time, notify_limit FROM timing_settings WHERE exe_name = ?",
-                (exe_name,),
-            ).fetchone()
-            return row if row else (0, 0)
+        return self._settings_snapshot().timing_settings.get(exe_name, (0, 0))
 
     def set_timing_settings_for_exe(
         self, exe_name, max_time=DEFAULT_TIME_LIMIT, notify_limit=0, commit=True
     ):
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             # Check if exe is assigned as a game
             if not self.get_is_present(exe_name):
                 raise ValueError(
@@ -312,9 +679,10 @@ class DB:  # pylint: disable=too-many-public-methods
             )
             if commit:
                 conn.commit()
+        self._bump_settings_generation()
 
     def update_global_timing_settings(self, limit=DEFAULT_GLOBAL_TIMING_LIMIT):
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             conn.execute(
                 """
                 INSERT INTO settings (key, value)
@@ -324,6 +692,7 @@ class DB:  # pylint: disable=too-many-public-methods
                 (limit,),
             )
             conn.commit()
+        self._bump_settings_generation()
 
     def update_timing_settings(
         self, exe_name, max_time=DEFAULT_TIME_LIMIT, notify_limit=DEFAULT_TIME_LIMIT
@@ -332,7 +701,7 @@ class DB:  # pylint: disable=too-many-public-methods
         Update the timing settings for a specific game executable.
         If the executable is not classified as a game, raise an error.
         """
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             # Check if exe is assigned as a game
             is_a_game = conn.execute(
                 "SELECT is_game FROM is_game WHERE exe_name = ?", (exe_name,)
@@ -351,13 +720,45 @@ class DB:  # pylint: disable=too-many-public-methods
                 (exe_name, max_time, notify_limit),
             )
             conn.commit()
+        self._bump_settings_generation()
+
+    def update_timing_settings_bulk(self, changes):
+        """
+        Update the timing settings of many games in one transaction. `changes`
+        holds (exe_name, max_time, notify_limit) tuples. Executables that are
+        not classified as games are skipped, returns {exe_name: error} for them.
+        """
+        if not changes:
+            return {}
+        with self._write() as conn:
+            games = {
+                row[0]
+                for row in conn.execute("SELECT exe_name FROM is_game WHERE is_game = 1")
+            }
+            rejected = {
+                exe_name: f"Executable '{exe_name}' is not classified as a game."
+                for exe_name, _, _ in changes
+                if exe_name not in games
+            }
+            conn.executemany(
+                """
+                INSERT INTO timing_settings (exe_name, max_time, notify_limit)
+                VALUES (?, ?, ?)
+                ON CONFLICT(exe_name) DO UPDATE SET
+                max_time = excluded.max_time, notify_limit = excluded.notify_limit
+            """,
+                [change for change in changes if change[0] not in rejected],
+            )
+            conn.commit()
+        self._bump_settings_generation()
+        return rejected
 
     def refresh_time_limit_list(self):
         """
         Refresh the timing settings for all games.
         Add default time limits for all classified games if not already set, else do nothing.
         """
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             # Get all classified games
             games = conn.execute(
                 "SELECT exe_name FROM is_game WHERE is_game = 1"
@@ -374,136 +775,709 @@ class DB:  # pylint: disable=too-many-public-methods
                     (exe_name,),
                 )
             conn.commit()
+        self._bump_settings_generation()
 
     def get_all_timing_settings(self):
-        with _LOCK, self._connect() as conn:
-            return conn.execute(
-                "SELECT exe_name, max_time, notify_limit FROM timing_settings"
-            ).fetchall()
+        return list(self._settings_snapshot().timing_rows)
 
     def get_global_timing_limit(self):
-        with _LOCK, self._connect() as conn:
-            row = conn.execute(
-                "SELECT value FROM settings WHERE key = 'global_timing_limit'"
-            ).fetchone()
-            return int(row[0]) if row else 60
+        value = self._settings_snapshot().values.get("global_timing_limit")
+        return int(value) if value is not None else 60
 
     ##### Voilations #####
-    def get_games_with_time_violations(self, running_processes):
+    def record_violation(self, exe_name, reason, kill_threshold):
         """
-        Get all games which have violated the time limit.
-        Will fetch from both the timings and is_game tables to get the necessary information.
+        Count a limit violation for today and update the escalation stage in place.
+        The stage goes from 'warning' to 'killed' once the warning count reaches
+        `kill_threshold`. Stage transitions are appended to the violations audit
+        log (unless the `violation_audit_log` setting is "0").
+        Returns (warning_count, stage).
         """
-        # Get today's timings
-        current_timings = self.get_timing_today()
-        current_timings_dict = {row[0]: row[1] for row in current_timings}
-        timing_settings = self.get_all_timing_settings()
-        timing_settings_dict = {row[0]: row[1] for row in timing_settings}
+        day = day_key()
+        now = datetime.now().isoformat()
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT warning_count, stage FROM violation_state WHERE exe_name = ? AND day = ?",
+                (exe_name, day),
+            ).fetchone()
+            previous_stage = row[1] if row else None
+            warning_count = (row[0] if row else 0) + 1
+            stage = "killed" if warning_count >= kill_threshold else "warning"
 
-        with _LOCK, self._connect() as conn:
-            # Fetch violations too to ignore duplicate entries
-            current_violations = conn.execute(
-                "SELECT exe_name FROM violations"
-            ).fetchall()
-            current_violations_set = set(row[0] for row in current_violations)
-
-            violations = []
-            seen_violations = set()  # To avoid duplicate entries in the violations list
-            for exe_name, max_time in timing_settings_dict.items():
-                # If already in violations, skip if not running
-                if (
-                    exe_name in current_violations_set
-                    and exe_name not in running_processes
-                ):
-                    if exe_name not in seen_violations:
-                        violations.append((exe_name, 0, max_time))
-                    seen_violations.add(exe_name)
-                    continue
+            conn.execute(
+                """
+                INSERT INTO violation_state (exe_name, day, warning_count, first_at, last_at, stage)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(exe_name, day) DO UPDATE SET
+                warning_count = excluded.warning_count,
+                last_at = excluded.last_at,
+                stage = excluded.stage
+            """,
+                (exe_name, day, warning_count, now, now, stage),
+            )
 
-                # Find current duration for this game
-                current_duration = current_timings_dict.get(exe_name, 0)
-                if (
-                    max_time > 0.1 and current_duration > 0.1
-                ) and current_duration > max_time * 60:  # Only consider if max_time is set and greater than 0.1 minutes and current_duration is greater than 0.1 minutes
-                    # If current duration exceeds max time, add to violations
-                    violations.append((exe_name, current_duration, max_time))
-            # Add entries to violations table
-            for exe_name, current_duration, max_time in violations:
-                reason = f"Exceeded time limit of {max_time} minutes. Current duration: {current_duration // 60} minutes."
+            if stage != previous_stage and self._audit_log_enabled():
                 conn.execute(
                     """
                     INSERT INTO violations (exe_name, timestamp, reason)
                     VALUES (?, ?, ?)
                 """,
-                    (exe_name, datetime.now().isoformat(), reason),
+                    (exe_name, now, reason),
                 )
             conn.commit()
-            return violations
+            return warning_count, stage
+
+    def get_violation_states(self):
+        """
+        Return today's violation state per exe as a dict of
+        exe_name -> (warning_count, first_at, last_at, stage).
+        """
+        day = day_key()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT exe_name, warning_count, first_at, last_at, stage
+                FROM violation_state WHERE day = ?
+            """,
+                (day,),
+            ).fetchall()
+            return {row[0]: tuple(row[1:]) for row in rows}
 
     def get_all_violations(self):
-        with _LOCK, self._connect() as conn:
+        """
+        Return today's violations as (exe_name, timestamp, reason) rows, newest first.
+        Read from the audit log, or built from the state table if the log is off.
+        """
+        day = day_key()
+        with self._connect() as conn:
+            if self._audit_log_enabled():
+                return conn.execute(
+                    """
+                    SELECT exe_name, timestamp, reason FROM violations
+                    WHERE timestamp >= ? ORDER BY timestamp DESC
+                """,
+                    (day_start(day).isoformat(),),
+                ).fetchall()
             return conn.execute(
-                "SELECT exe_name, timestamp, reason FROM violations ORDER BY timestamp DESC"
+                """
+                SELECT exe_name, last_at,
+                    'Exceeded time limit ' || warning_count || ' times. Stage: ' || stage
+                FROM violation_state WHERE day = ? ORDER BY last_at DESC
+            """,
+                (day,),
             ).fetchall()
 
     def get_violation_count_for_exe(self, exe_name):
-        with _LOCK, self._connect() as conn:
+        day = day_key()
+        with self._connect() as conn:
             row = conn.execute(
-                "SELECT COUNT(*) FROM violations WHERE exe_name = ?", (exe_name,)
+                "SELECT warning_count FROM violation_state WHERE exe_name = ? AND day = ?",
+                (exe_name, day),
             ).fetchone()
             return row[0] if row else 0
 
+    ##### Sessions #####
+    def open_session(self, exe_name, pid, start_ts):
+        """Start logging a game run. Returns the session id."""
+        with self._write() as conn:
+            cur = conn.execute(
+                """
+                INSERT INTO sessions (exe_name, pid, start_ts, end_ts, closed)
+                VALUES (?, ?, ?, ?, 0)
+            """,
+                (exe_name, pid, start_ts, start_ts),
+            )
+            conn.commit()
+            return cur.lastrowid
+
+    def close_session(self, session_id, end_ts):
+        """Close a session and add its time to the rollups in one transaction."""
+        with self._write() as conn:
+            self._close_sessions(conn, [(session_id, end_ts)])
+            conn.commit()
+
+    def close_open_sessions(self, end_ts=None):
+        """
+        Close every open session. With no end_ts each session ends at its last
+        heartbeat, which is what start-up uses to recover from a crash.
+        """
+        with self._write() as conn:
+            rows = conn.execute(
+                "SELECT id, end_ts FROM sessions WHERE closed = 0"
+            ).fetchall()
+            self._close_sessions(
+                conn, [(sid, end_ts if end_ts is not None else last) for sid, last in rows]
+            )
+            conn.commit()
+
+    @staticmethod
+    def _close_sessions(conn, closes):
+        rollups = {}
+        for session_id, end_ts in closes:
+            row = conn.execute(
+                "SELECT exe_name, start_ts FROM sessions WHERE id = ? AND closed = 0",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                continue
+            exe_name, start_ts = row
+            end_ts = max(start_ts, end_ts)
+            conn.execute(
+                "UPDATE sessions SET end_ts = ?, closed = 1 WHERE id = ?",
+                (end_ts, session_id),
+            )
+            for (granularity, bucket), seconds in split_session(start_ts, end_ts).items():
+                key = (granularity, bucket, exe_name)
+                rollups[key] = rollups.get(key, 0) + seconds
+
+        conn.executemany(
+            """
+            INSERT INTO usage_rollups (granularity, bucket, exe_name, seconds)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(granularity, bucket, exe_name) DO UPDATE SET
+            seconds = seconds + excluded.seconds
+        """,
+            [(*key, seconds) for key, seconds in rollups.items()],
+        )
+
+    def rebuild_rollups(self):
+        """Recompute every rollup row from the closed sessions, archived ones included."""
+        rollups = {}
+        for _, exe_name, _, start_ts, end_ts, closed in self._iter_archived("sessions"):
+            if closed:
+                for (granularity, bucket), seconds in split_session(start_ts, end_ts).items():
+                    key = (granularity, bucket, exe_name)
+                    rollups[key] = rollups.get(key, 0) + seconds
+        with self._write() as conn:
+            cur = conn.execute(
+                "SELECT exe_name, start_ts, end_ts FROM sessions WHERE closed = 1"
+            )
+            while True:
+                rows = cur.fetchmany(1000)
+                if not rows:
+                    break
+                for exe_name, start_ts, end_ts in rows:
+                    for (granularity, bucket), seconds in split_session(start_ts, end_ts).items():
+                        key = (granularity, bucket, exe_name)
+                        rollups[key] = rollups.get(key, 0) + seconds
+            conn.execute("DELETE FROM usage_rollups")
+            conn.executemany(
+                """
+                INSERT INTO usage_rollups (granularity, bucket, exe_name, seconds)
+                VALUES (?, ?, ?, ?)
+            """,
+                [(*key, seconds) for key, seconds in rollups.items()],
+            )
+            conn.commit()
+
+    def get_usage_history(self, granularity="day", start=None, end=None, exe_name=None):
+        """
+        Return (bucket, exe_name, seconds) rows from the rollups, newest first.
+        Buckets are the integers from data.rollups, `start`/`end` are inclusive
+        bucket bounds.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}'.")
+        query = "SELECT bucket, exe_name, seconds FROM usage_rollups WHERE granularity = ?"
+        params = [granularity]
+        if start is not None:
+            query += " AND bucket >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND bucket <= ?"
+            params.append(end)
+        if exe_name is not None:
+            query += " AND exe_name = ?"
+            params.append(exe_name)
+        query += " ORDER BY bucket DESC, exe_name"
+        with self._connect() as conn:
+            return conn.execute(query, params).fetchall()
+
+    ##### Export / Import #####
+    def iter_export_batches(self, dataset, batch_size=EXPORT_BATCH_SIZE):
+        """
+        Yield lists of up to batch_size rows of a dataset, oldest first, with the
+        columns in EXPORT_COLUMNS. Archived history is included. Rows are fetched
+        from a cursor batch by batch, the table is never loaded whole.
+        """
+        if dataset == "timings":
+            archived = (
+                (exe_name, day_to_iso(day), duration)
+                for exe_name, day, duration in self._iter_archived("timings")
+            )
+            query = "SELECT exe_name, day, duration FROM timings ORDER BY day"
+        elif dataset == "violations":
+            archived = (row[1:] for row in self._iter_archived("violations"))
+            query = "SELECT exe_name, timestamp, reason FROM violations ORDER BY timestamp"
+        elif dataset == "sessions":
+            archived = (row[1:5] for row in self._iter_archived("sessions") if row[5])
+            query = (
+                "SELECT exe_name, pid, start_ts, end_ts FROM sessions "
+                "WHERE closed = 1 ORDER BY id"
+            )
+        else:
+            raise ValueError(f"Unknown dataset '{dataset}'.")
+
+        while batch := list(islice(archived, batch_size)):
+            yield batch
+
+        cur = self._connect().execute(query)
+        try:
+            while rows := cur.fetchmany(batch_size):
+                if dataset == "timings":
+                    rows = [
+                        (exe_name, day_to_iso(day), duration)
+                        for exe_name, day, duration in rows
+                    ]
+                yield rows
+        finally:
+            cur.close()
+
+    def import_batches(self, dataset, batches):
+        """
+        Write batches of rows (columns as in EXPORT_COLUMNS) with one
+        executemany transaction per batch. Importing the same data twice does
+        not duplicate it: timings are overwritten, known violations and sessions
+        are skipped, and so are rows of days already moved to archive files
+        (exports include those). Returns the number of rows read.
+        """
+        if dataset not in EXPORT_COLUMNS:
+            raise ValueError(f"Unknown dataset '{dataset}'.")
+
+        count = 0
+        for batch in batches:
+            if not batch:
+                continue
+            count += len(batch)
+            with self._write() as conn:
+                archived = conn.execute(
+                    "SELECT first_day, last_day FROM archives WHERE table_name = ?",
+                    (dataset,),
+                ).fetchall()
+                if archived:
+                    batch = [
+                        row
+                        for row in batch
+                        if not any(
+                            first_day <= self._import_row_day(dataset, row) <= last_day
+                            for first_day, last_day in archived
+                        )
+                    ]
+                    if not batch:
+                        continue
+                if dataset == "timings":
+                    self._import_timings(conn, batch)
+                elif dataset == "violations":
+                    conn.executemany(
+                        """
+                        INSERT INTO violations (exe_name, timestamp, reason)
+                        SELECT ?1, ?2, ?3 WHERE NOT EXISTS (
+                            SELECT 1 FROM violations WHERE timestamp = ?2 AND exe_name = ?1
+                        )
+                    """,
+                        batch,
+                    )
+                else:
+                    conn.executemany(
+                        """
+                        INSERT INTO sessions (exe_name, pid, start_ts, end_ts, closed)
+                        SELECT ?1, ?2, ?3, ?4, 1 WHERE NOT EXISTS (
+                            SELECT 1 FROM sessions WHERE start_ts = ?3 AND exe_name = ?1
+                        )
+                    """,
+                        batch,
+                    )
+                conn.commit()
+
+        if dataset == "sessions" and count:
+            self.rebuild_rollups()
+        return count
+
+    @staticmethod
+    def _import_row_day(dataset, row):
+        """Tracking day of an imported row, columns as in EXPORT_COLUMNS."""
+        if dataset == "timings":
+            return iso_to_day(row[1])
+        if dataset == "violations":
+            return row_day("violations", row[1])
+        return row_day("sessions", float(row[2]))
+
+    @staticmethod
+    def _import_timings(conn, batch):
+        rows = [(exe_name, iso_to_day(date), int(duration)) for exe_name, date, duration in batch]
+        conn.executemany(
+            """
+            INSERT INTO timings (exe_name, day, duration)
+            VALUES (?, ?, ?)
+            ON CONFLICT(exe_name, day) DO UPDATE SET
+            duration = excluded.duration
+        """,
+            rows,
+        )
+        # Keep the per day totals in line with the imported timings
+        conn.executemany(
+            """
+            INSERT INTO daily_usage (day, total_time)
+            SELECT day, SUM(duration) FROM timings WHERE day = ?
+            ON CONFLICT(day) DO UPDATE SET
+            total_time = excluded.total_time
+        """,
+            [(day,) for day in {row[1] for row in rows}],
+        )
+
+    ##### Pages #####
+    def _select_page(self, dataset, conditions, order, descending, after, limit):
+        # Column names and operators come from PAGE_DATASETS / PAGE_FILTERS,
+        # only the values are caller supplied
+        clauses = [f"{column} {op} ?" for column, op, _ in conditions]
+        params = [value for _, _, value in conditions]
+        if after is not None:
+            clauses.append(
+                f"({', '.join(order)}) {'<' if descending else '>'} "
+                f"({', '.join('?' * len(order))})"
+            )
+            params.extend(after)
+        direction = " DESC" if descending else ""
+        query = f"SELECT {', '.join(PAGE_DATASETS[dataset][0])} FROM {_PAGE_SOURCES[dataset]}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY " + ", ".join(column + direction for column in order) + " LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        if dataset == "timings":
+            rows = self._merge_archived_timings(rows, conditions, order, descending, after, limit)
+        return rows
+
+    def _merge_archived_timings(
+        self, rows, conditions, order, descending, after, limit
+    ):  # pylint: disable=too-many-arguments
+        """
+        Add archived days to a page of live timings. Archive files are only
+        opened when they overlap the day filters and could still reach the page.
+        """
+        start_day = end_day = None
+        for column, op, value in conditions:
+            if column == "day":
+                if op == ">=":
+                    start_day = value
+                else:
+                    end_day = value
+        with self._connect() as conn:
+            archived_last = conn.execute(
+                "SELECT MAX(last_day) FROM archives WHERE table_name = 'timings'"
+            ).fetchone()[0]
+        if archived_last is None or (start_day is not None and start_day > archived_last):
+            return rows
+        # Newest first, a full page of days after every archive is already final
+        if order[0] == "day" and descending and len(rows) == limit and rows[-1][1] > archived_last:
+            return rows
+
+        columns = PAGE_DATASETS["timings"][0]
+        checks = [
+            (columns.index(column), PAGE_OPERATORS[op], value) for column, op, value in conditions
+        ]
+        positions = [columns.index(column) for column in order]
+
+        def sort_key(row):
+            return tuple(row[i] for i in positions)
+
+        beyond = operator.lt if descending else operator.gt
+        archived = [
+            row
+            for row in self._iter_archived("timings", start_day, end_day)
+            if all(check(row[i], value) for i, check, value in checks)
+            and (after is None or beyond(sort_key(row), after))
+        ]
+        if not archived:
+            return rows
+        return sorted(rows + archived, key=sort_key, reverse=descending)[:limit]
+
+    def _has_search_index(self):
+        indexed = _SEARCH_INDEXED.get(self.path)
+        if indexed is None:
+            with self._connect() as conn:
+                indexed = _SEARCH_INDEXED[self.path] = bool(
+                    conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE name = 'is_game_search'"
+                    ).fetchone()
+                )
+        return indexed
+
+    def _search_processes(self, query, prefix, after, limit):
+        clauses, params = [], []
+        if query:
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            if self._has_search_index():
+                # The trigram index narrows the rows down, unescaped wildcards
+                # only make that a superset. The LIKE below is exact.
+                clauses.append(
+                    "g.id IN (SELECT rowid FROM is_game_search WHERE exe_name LIKE ?)"
+                )
+                params.append(("" if prefix else "%") + query + "%")
+            clauses.append("g.exe_name LIKE ? ESCAPE '\\'")
+            params.append(("" if prefix else "%") + escaped + "%")
+        if after is not None:
+            clauses.append(
+                """(g.is_game < ? OR (g.is_game = ? AND (
+                    g.exe_name COLLATE NOCASE > ?
+                    OR (g.exe_name COLLATE NOCASE = ? AND g.exe_name > ?)
+                )))"""
+            )
+            is_game, exe_name = after
+            params.extend((is_game, is_game, exe_name, exe_name, exe_name))
+        query_sql = "SELECT g.exe_name, g.is_game, g.user_marked FROM is_game g"
+        if clauses:
+            query_sql += " WHERE " + " AND ".join(clauses)
+        query_sql += " ORDER BY g.is_game DESC, g.exe_name COLLATE NOCASE, g.exe_name LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            return conn.execute(query_sql, params).fetchall()
+
+    ##### Title Match Memo #####
+    def get_title_matches(self, exe_keys, corpus_version):
+        """
+        Return memoized title matches for the given normalized exe names.
+        Returns a dict of exe_key -> (result, match, score) for the keys found.
+        """
+        exe_keys = list(exe_keys)
+        matches = {}
+        with self._connect() as conn:
+            # Stay well below SQLite's bound parameter limit
+            for i in range(0, len(exe_keys), 500):
+                chunk = exe_keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"""
+                    SELECT exe_key, result, match, score FROM title_match_cache
+                    WHERE corpus_version = ? AND exe_key IN ({placeholders})
+                """,
+                    (corpus_version, *chunk),
+                ).fetchall()
+                for exe_key, result, match, score in rows:
+                    matches[exe_key] = (result, match, score)
+        return matches
+
+    def save_title_matches(self, matches, corpus_version):
+        with self._write() as conn:
+            conn.executemany(
+                """
+                INSERT INTO title_match_cache (exe_key, corpus_version, result, match, score)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(exe_key, corpus_version) DO UPDATE SET
+                result = excluded.result, match = excluded.match, score = excluded.score
+            """,
+                [
+                    (exe_key, corpus_version, result, match, score)
+                    for exe_key, (result, match, score) in matches.items()
+                ],
+            )
+            conn.commit()
+
+    ##### Retention #####
+    @property
+    def archive_dir(self):
+        return os.path.join(os.path.dirname(os.path.abspath(self.path)), "archive")
+
+    def archive_rows_before(self, table, cutoff_day):
+        """
+        Move the oldest span of rows older than cutoff_day from a table into a
+        compressed archive file. Returns the number of rows moved, 0 when there
+        is nothing left to archive.
+
+        The file is compressed and fsynced before the write lock is taken. Under
+        the lock the span is read again, and only if it is unchanged the
+        manifest row is added and the rows are deleted.
+        """
+        columns, day_column = ARCHIVED_TABLES[table]
+        while True:
+            with self._connect() as conn:
+                row = conn.execute(
+                    f"SELECT MIN({day_column}) FROM {table} WHERE {day_column} < ?",
+                    (day_bound(table, cutoff_day),),
+                ).fetchone()
+                if row[0] is None:
+                    return 0
+                first_day = row_day(table, row[0])
+                next_day = min(cutoff_day, first_day + ARCHIVE_SPAN_DAYS)
+                upper = day_bound(table, next_day)
+                span_query = (
+                    f"SELECT {columns} FROM {table} WHERE {day_column} < ? ORDER BY {day_column}"
+                )
+                rows = conn.execute(span_query, (upper,)).fetchall()
+
+            name = f"{table}.{day_to_iso(first_day)}.{int(time.time())}.jsonl.zst"
+            path = os.path.join(self.archive_dir, name)
+            write_archive(path, rows)
+
+            with self._write() as conn:
+                if conn.execute(span_query, (upper,)).fetchall() == rows:
+                    conn.execute(
+                        """
+                        INSERT INTO archives
+                        (table_name, first_day, last_day, path, row_count, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                        (
+                            table, first_day, next_day - 1, name, len(rows),
+                            datetime.now().isoformat(),
+                        ),
+                    )
+                    conn.execute(f"DELETE FROM {table} WHERE {day_column} < ?", (upper,))
+                    conn.commit()
+                    return len(rows)
+            # Rows changed while the file was written, archive the span again
+            os.remove(path)
+
+    def prune_rows_before(self, table, cutoff_day):
+        with self._write() as conn:
+            conn.execute(f"DELETE FROM {table} WHERE day < ?", (cutoff_day,))
+            conn.commit()
+
+    def prune_rollups_before(self, granularities, cutoff_day):
+        """Drop rollup buckets of the given granularities that end before cutoff_day."""
+        bounds = {
+            "hour": hour_bucket(day_start(cutoff_day)),
+            "day": cutoff_day,
+            "week": week_bucket(cutoff_day),
+            "month": month_bucket(cutoff_day),
+        }
+        with self._write() as conn:
+            conn.executemany(
+                "DELETE FROM usage_rollups WHERE granularity = ? AND bucket < ?",
+                [(granularity, bounds[granularity]) for granularity in granularities],
+            )
+            conn.commit()
+
+    def _iter_archived(self, table, start_day=None, end_day=None):
+        """Yield archived rows of a table, opening only files that overlap the range."""
+        query = "SELECT path FROM archives WHERE table_name = ?"
+        params = [table]
+        if start_day is not None:
+            query += " AND last_day >= ?"
+            params.append(start_day)
+        if end_day is not None:
+            query += " AND first_day <= ?"
+            params.append(end_day)
+        query += " ORDER BY first_day"
+        with self._connect() as conn:
+            paths = [row[0] for row in conn.execute(query, params).fetchall()]
+
+        columns, day_column = ARCHIVED_TABLES[table]
+        day_index = [column.strip() for column in columns.split(",")].index(day_column)
+        for name in paths:
+            path = os.path.join(self.archive_dir, name)
+            if not os.path.exists(path):
+                continue
+            for row in read_archive(path):
+                day = row_day(table, row[day_index])
+                if start_day is not None and day < start_day:
+                    continue
+                if end_day is not None and day > end_day:
+                    continue
+                yield tuple(row)
+
+    def incremental_vacuum(self, max_pages):
+        """
+        Free up to max_pages unused pages. Returns how many free pages are left.
+        Migration 7 switched the DB to incremental auto vacuum.
+        """
+        with self._write() as conn:
+            # executescript steps the pragma to completion, execute() frees one page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    ##### Backups #####
+    def backup_to(self, dest_path, pages=BACKUP_PAGES_PER_STEP):
+        """
+        Copy the DB to dest_path with the SQLite backup API, `pages` pages per
+        step. Runs on a read connection and never takes the write lock, writers
+        only restart the copy of the pages they changed.
+        """
+        with sqlite3.connect(dest_path) as dest:
+            self._connect().backup(dest, pages=pages, sleep=BACKUP_STEP_SLEEP)
+        dest.close()
+
+    @staticmethod
+    def verify_backup(path):
+        """Return True if the file is an intact tracker database."""
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                if conn.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+                    return False
+                return get_schema_version_readonly(conn) > 0
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return False
+
+    def restore_from(self, src_path):
+        """
+        Replace the DB contents with the database at src_path. Holds the write
+        lock for the copy, readers in other threads see the restored data on
+        their next query. Older schemas are migrated afterwards.
+        """
+        with _LOCK:
+            conn = self._connect()
+            with sqlite3.connect(f"file:{src_path}?mode=ro", uri=True) as src:
+                src.backup(conn)
+            src.close()
+            if get_schema_version(conn) < SCHEMA_VERSION:
+                migrate(conn)
+            _SEARCH_INDEXED.pop(self.path, None)
+            self._bump_write_generation()
+            with _GAME_NAMES_LOCK:
+                _GAME_NAMES_GENERATION[self.path] = _GAME_NAMES_GENERATION.get(self.path, 0) + 1
+                _GAME_NAMES_CACHE.pop(self.path, None)
+        self._bump_settings_generation()
+
     ##### Miscellaneous Methods #####
     def get_is_data_populated_today(self):
         """
         Check if the data for today is populated.
         Returns True if populated, False if not.
         """
-        date = datetime.now().date().isoformat()
-        with _LOCK, self._connect() as conn:
+        day = day_key()
+        with self._connect() as conn:
             row = conn.execute(
-                "SELECT is_populated FROM is_data_populated_today WHERE date = ?",
-                (date,),
+                "SELECT is_populated FROM is_data_populated_today WHERE day = ?",
+                (day,),
             ).fetchone()
             return bool(row[0]) if row else False
 
-    def populate_data_today(self):
+    def populate_data_today(self, day=None):
         """
-        Populate esssential data for today.
+        Populate esssential data for today (or the given day) in one transaction.
         """
-        date = datetime.now().date().isoformat()
+        day = day_key() if day is None else day
 
-        # Add game timing entries for today
-        games = self.get_game_names()
-
-        with _LOCK, self._connect() as conn:
-            for game in games:
-                conn.execute(
-                    """
-                    INSERT INTO timings (exe_name, date, duration)
-                    VALUES (?, ?, 0)
-                    ON CONFLICT(exe_name, date) DO NOTHING
-                """,
-                    (game, date),
-                )
+        with self._write() as conn:
+            # Add game timing entries for the day
+            conn.execute(
+                """
+                INSERT INTO timings (exe_name, day, duration)
+                SELECT exe_name, ?, 0 FROM is_game WHERE is_game = 1
+                ON CONFLICT(exe_name, day) DO NOTHING
+            """,
+                (day,),
+            )
 
-            # Remove all violations. Fresh start for the day
-            conn.execute("DELETE FROM violations")
             # Mark today's data as populated
             conn.execute(
                 """
-                INSERT INTO is_data_populated_today (date, is_populated)
+                INSERT INTO is_data_populated_today (day, is_populated)
                 VALUES (?, 1)
-                ON CONFLICT(date) DO UPDATE SET is_populated = 1
+                ON CONFLICT(day) DO UPDATE SET is_populated = 1
             """,
-                (date,),
+                (day,),
             )
             conn.commit()
 
     ##### Migration Methods #####
 
     def migrate_add_column(self, table, column, type_="TEXT", default=None):
-        with _LOCK, self._connect() as conn:
+        with self._write() as conn:
             cols = conn.execute(f"PRAGMA table_info({table})").fetchall()
             col_names = [col[1] for col in cols]
             if column not in col_names:
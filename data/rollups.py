@@ -0,0 +1,46 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from .days import EPOCH, day_key
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+_EPOCH_DATETIME = datetime(1970, 1, 1)
+
+
+def hour_bucket(moment: datetime) -> int:
+    """Local hours since 1970-01-01 00:00."""
+    return int((moment - _EPOCH_DATETIME).total_seconds() // 3600)
+
+
+def week_bucket(day: int) -> int:
+    """Weeks (starting on Monday) since the week of 1970-01-01."""
+    return (day + 3) // 7  # 1970-01-01 was a Thursday
+
+
+def month_bucket(day: int) -> int:
+    """Months since January 1970."""
+    date = EPOCH + timedelta(days=day)
+    return (date.year - 1970) * 12 + date.month - 1
+
+
+def split_session(start_ts: float, end_ts: float):
+    """
+    Split a session into rollup buckets.
+    Returns {(granularity, bucket): seconds}, every hour/day/week/month the
+    session touched gets exactly the seconds that fell inside it.
+    """
+    buckets = defaultdict(int)
+    moment = datetime.fromtimestamp(start_ts)
+    end = datetime.fromtimestamp(max(start_ts, end_ts))
+    while moment < end:
+        next_hour = moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        chunk_end = min(next_hour, end)
+        seconds = (chunk_end - moment).total_seconds()
+        day = day_key(moment)
+        buckets[("hour", hour_bucket(moment))] += seconds
+        buckets[("day", day)] += seconds
+        buckets[("week", week_bucket(day))] += seconds
+        buckets[("month", month_bucket(day))] += seconds
+        moment = chunk_end
+    return {key: int(round(seconds)) for key, seconds in buckets.items() if seconds > 0}
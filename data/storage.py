@@ -0,0 +1,438 @@
+"""
+Storage interface of the tracker.
+
+`Storage` lists the operations the tracker, classifier, violation engine and
+dashboard run against their database. data.orm.DB implements it on SQLite (a
+file, or a shared-cache in-memory database) and data.memory_store.MemoryDB on
+plain dicts. Use data.open_db() to get the backend selected by DB_BACKEND.
+
+Methods that only combine other methods live here, so every backend shares
+them.
+"""
+
+import operator
+from abc import ABC, abstractmethod
+
+from .days import day_key, day_to_iso
+from .rollups import GRANULARITIES
+
+DEFAULT_TIME_LIMIT = 60  # Default time limit for games in minutes
+DEFAULT_GLOBAL_TIMING_LIMIT = 60  # Default global timing limit in minutes
+
+# Columns of every dataset handled by export/import, in row order
+EXPORT_COLUMNS = {
+    "timings": ("exe_name", "date", "duration"),
+    "sessions": ("exe_name", "pid", "start_ts", "end_ts"),
+    "violations": ("exe_name", "timestamp", "reason"),
+}
+EXPORT_BATCH_SIZE = 5000
+
+# Datasets read page by page with get_page:
+# dataset -> (columns, sortable columns, key columns)
+# The key columns identify a row and break ties in the sort order.
+PAGE_DATASETS = {
+    "timings": (
+        ("exe_name", "day", "duration"),
+        ("day", "duration", "exe_name"),
+        ("exe_name", "day"),
+    ),
+    "history": (
+        ("granularity", "bucket", "exe_name", "seconds"),
+        ("bucket", "seconds", "exe_name"),
+        ("granularity", "bucket", "exe_name"),
+    ),
+    "violations": (
+        ("id", "exe_name", "timestamp", "reason"),
+        ("timestamp", "exe_name", "id"),
+        ("id",),
+    ),
+    "processes": (
+        ("exe_name", "is_game", "user_marked", "max_time", "notify_limit"),
+        ("exe_name", "is_game"),
+        ("exe_name",),
+    ),
+}
+# dataset -> {filter name: (column, operator)}
+PAGE_FILTERS = {
+    "timings": {
+        "exe_name": ("exe_name", "="),
+        "start_day": ("day", ">="),
+        "end_day": ("day", "<="),
+    },
+    "history": {
+        "granularity": ("granularity", "="),
+        "start": ("bucket", ">="),
+        "end": ("bucket", "<="),
+        "exe_name": ("exe_name", "="),
+    },
+    "violations": {
+        "exe_name": ("exe_name", "="),
+        "since": ("timestamp", ">="),
+        "until": ("timestamp", "<"),
+    },
+    "processes": {
+        "is_game": ("is_game", "="),
+        "user_marked": ("user_marked", "="),
+    },
+}
+# PAGE_FILTERS operators for backends that filter rows in Python
+PAGE_OPERATORS = {
+    "=": operator.eq,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "<": operator.lt,
+}
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Storage path -> TimingAccumulator holding timings that are not flushed yet
+_TIMING_ACCUMULATORS = {}
+
+# Storage path -> number of writes committed through this process. Only
+# bumped by the backends while they hold their write lock.
+_WRITE_GENERATIONS = {}
+
+
+def page_query(dataset, sort=None, after=None, limit=PAGE_SIZE, **filters):
+    """
+    Validate get_page arguments without touching any storage, raising
+    ValueError. Returns (conditions, order, after, limit) with conditions as
+    (column, operator, value) tuples and order as the columns to sort by.
+    """
+    if dataset not in PAGE_DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'.")
+    _, sortable, key = PAGE_DATASETS[dataset]
+    sort = sort or sortable[0]
+    if sort not in sortable:
+        raise ValueError(f"Cannot sort {dataset} by '{sort}'.")
+    unknown = filters.keys() - PAGE_FILTERS[dataset].keys()
+    if unknown:
+        raise ValueError(f"Unknown filter '{sorted(unknown)[0]}' for {dataset}.")
+    if dataset == "history":
+        filters["granularity"] = filters.get("granularity") or "day"
+        if filters["granularity"] not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{filters['granularity']}'.")
+    conditions = [
+        (*PAGE_FILTERS[dataset][name], value)
+        for name, value in filters.items()
+        if value is not None
+    ]
+    order = (sort, *(column for column in key if column != sort))
+    if after is not None:
+        after = tuple(after)
+        if len(after) != len(order):
+            raise ValueError("Cursor does not match the sort order.")
+    return conditions, order, after, max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+class Storage(ABC):  # pylint: disable=too-many-public-methods
+    # False for backends that keep nothing once the process exits. Journals,
+    # archives and backups are skipped for those.
+    persistent = True
+
+    def __init__(self, path):
+        self.path = path
+
+    ##### Classification #####
+    @abstractmethod
+    def upsert_is_game(self, exe_name, is_game, user_marked=0):
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert_is_game_bulk(self, changes):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_game_names(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_game_name_set(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_is_game(self, exe_name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_is_present(self, exe_name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_processes(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_classified_processes(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_title_matches(self, exe_keys, corpus_version):
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_title_matches(self, matches, corpus_version):
+        raise NotImplementedError
+
+    ##### Timings #####
+    @abstractmethod
+    def update_timing_by_duration(self, exe_name, duration):
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_timing_deltas(self, deltas, journal_seq=None, heartbeat=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_timing_to_a_specific_value(self, exe_name, value):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_timing_for_exe(self, exe_name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_timing_today(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_total_time_today(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_daily_timings(self, start_day=None, end_day=None):
+        raise NotImplementedError
+
+    def get_timing_journal_seq(self):
+        return int(self.get_settings("timing_journal_seq", 0))
+
+    def attach_timing_accumulator(self, accumulator):
+        """Make timing reads on this storage include the accumulator's pending time."""
+        _TIMING_ACCUMULATORS[self.path] = accumulator
+
+    def _timing_accumulator(self):
+        return _TIMING_ACCUMULATORS.get(self.path)
+
+    def _pending_timings(self, day):
+        accumulator = self._timing_accumulator()
+        return accumulator.pending_for_day(day) if accumulator else {}
+
+    ##### Settings #####
+    @abstractmethod
+    def get_settings(self, key, default=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_settings(self, key, value):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_settings_generation(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def on_settings_change(self, callback):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_timing_settings_for_exe(self, exe_name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_timing_settings_for_exe(
+        self, exe_name, max_time=DEFAULT_TIME_LIMIT, notify_limit=0, commit=True
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_global_timing_settings(self, limit=DEFAULT_GLOBAL_TIMING_LIMIT):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_timing_settings(
+        self, exe_name, max_time=DEFAULT_TIME_LIMIT, notify_limit=DEFAULT_TIME_LIMIT
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_timing_settings_bulk(self, changes):
+        raise NotImplementedError
+
+    @abstractmethod
+    def refresh_time_limit_list(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_timing_settings(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_global_timing_limit(self):
+        raise NotImplementedError
+
+    ##### Violations #####
+    @abstractmethod
+    def add_violation(self, exe_name, reason):
+        raise NotImplementedError
+
+    @abstractmethod
+    def record_violation(self, exe_name, reason, kill_threshold):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_violation_states(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_violations(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_violation_count_for_exe(self, exe_name):
+        raise NotImplementedError
+
+    def _audit_log_enabled(self):
+        return self.get_settings("violation_audit_log") != "0"
+
+    def get_games_with_time_violations(self, running_processes):
+        """
+        Get all games which have violated the time limit.
+        Running games over their limit are returned with their current duration,
+        games that already have a violation today but are not running with 0.
+        Read only, violations are recorded with record_violation.
+        """
+        current_timings_dict = {row[0]: row[1] for row in self.get_timing_today()}
+        timing_settings_dict = {row[0]: row[1] for row in self.get_all_timing_settings()}
+        violated_today = set(self.get_violation_states())
+
+        violations = []
+        for exe_name, max_time in timing_settings_dict.items():
+            if exe_name in violated_today and exe_name not in running_processes:
+                violations.append((exe_name, 0, max_time))
+                continue
+
+            # Only consider if max_time is set and greater than 0.1 minutes
+            current_duration = current_timings_dict.get(exe_name, 0)
+            if max_time > 0.1 and current_duration > 0.1 and current_duration > max_time * 60:
+                violations.append((exe_name, current_duration, max_time))
+        return violations
+
+    ##### Sessions #####
+    @abstractmethod
+    def open_session(self, exe_name, pid, start_ts):
+        raise NotImplementedError
+
+    @abstractmethod
+    def close_session(self, session_id, end_ts):
+        raise NotImplementedError
+
+    @abstractmethod
+    def close_open_sessions(self, end_ts=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def rebuild_rollups(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_usage_history(self, granularity="day", start=None, end=None, exe_name=None):
+        raise NotImplementedError
+
+    ##### Export / Import #####
+    @abstractmethod
+    def iter_export_batches(self, dataset, batch_size=EXPORT_BATCH_SIZE):
+        raise NotImplementedError
+
+    @abstractmethod
+    def import_batches(self, dataset, batches):
+        raise NotImplementedError
+
+    ##### Pages #####
+    def get_page(
+        self, dataset, sort=None, descending=False, after=None, limit=PAGE_SIZE, **filters
+    ):  # pylint: disable=too-many-arguments
+        """
+        Return (rows, next_after) for one page of a dataset, with the columns in
+        PAGE_DATASETS. Rows are ordered by `sort` and then the key columns.
+        Pass next_after back as `after` to get the following page, it is None
+        on the last one. Keyset pagination, a page costs the same however deep
+        it is.
+
+        Timings include archived days and today's buffered time.
+        """
+        conditions, order, after, limit = page_query(dataset, sort, after, limit, **filters)
+        columns = PAGE_DATASETS[dataset][0]
+        rows = self._select_page(dataset, conditions, order, descending, after, limit + 1)
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = tuple(rows[-1][columns.index(column)] for column in order)
+
+        if dataset == "timings":
+            today = day_key()
+            pending = self._pending_timings(today)
+            rows = [
+                (
+                    exe_name,
+                    day_to_iso(day),
+                    duration + (pending.get(exe_name, 0) if day == today else 0),
+                )
+                for exe_name, day, duration in rows
+            ]
+        return rows, next_after
+
+    def search_processes(self, query="", prefix=False, after=None, limit=PAGE_SIZE):
+        """
+        Return (rows, next_after) for one page of (exe_name, is_game,
+        user_marked) rows whose name contains `query` (starts with it if
+        `prefix`), ignoring case. Games come first, then names alphabetically.
+        Pass next_after back as `after` for the following page.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if after is not None:
+            after = tuple(after)
+            if len(after) != 2:
+                raise ValueError("Cursor does not match the sort order.")
+        rows = self._search_processes(query or "", prefix, after, limit + 1)
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1][1], rows[-1][0])
+        return rows, next_after
+
+    @abstractmethod
+    def _search_processes(self, query, prefix, after, limit):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _select_page(self, dataset, conditions, order, descending, after, limit):
+        """
+        Backend part of get_page: up to `limit` rows matching every
+        (column, operator, value) condition, ordered by the `order` columns
+        and starting after the `after` values of those columns.
+        """
+        raise NotImplementedError
+
+    ##### Data Version #####
+    def get_write_generation(self):
+        return _WRITE_GENERATIONS.get(self.path, 0)
+
+    def _bump_write_generation(self):
+        _WRITE_GENERATIONS[self.path] = _WRITE_GENERATIONS.get(self.path, 0) + 1
+
+    def get_data_version(self):
+        """
+        Return (day, write generation, buffered timing seq). Reads can only
+        return something new once this changes, so it keys caches and ETags.
+        """
+        accumulator = self._timing_accumulator()
+        return day_key(), self.get_write_generation(), accumulator.seq if accumulator else 0
+
+    ##### Miscellaneous Methods #####
+    @abstractmethod
+    def get_is_data_populated_today(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def populate_data_today(self, day=None):
+        raise NotImplementedError
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from log_utils import get_logger
+
+from .days import day_key, iso_to_day
+
+logger = get_logger("timing_accumulator", "tracker.log")
+
+
+class TimingAccumulator:
+    """
+    Write-behind buffer for game timings.
+
+    Durations are summed in memory and written to the DB in a single
+    transaction every FLUSH_INTERVAL seconds, on day rollover and on an explicit
+    flush(). Every add() is appended to a small journal file which is replayed
+    on start-up, so a crash loses at most JOURNAL_FSYNC_INTERVAL seconds of
+    usage (nothing at all if only the process dies).
+
+    The accumulator registers itself with the DB so timing reads include the
+    amounts that have not been flushed yet.
+    """
+
+    FLUSH_INTERVAL = 30  # seconds
+    JOURNAL_FSYNC_INTERVAL = 10  # seconds
+
+    def __init__(self, db, flush_interval=FLUSH_INTERVAL, journal_path=None):
+        self.db = db
+        self.flush_interval = flush_interval
+        if journal_path is None and db.persistent:
+            journal_path = os.path.join(
+                os.path.dirname(os.path.abspath(db.path)), "timings.journal"
+            )
+        # No journal for in-memory storage, there is nothing to recover into
+        self.journal_path = journal_path
+        self._lock = threading.RLock()
+        self._pending = defaultdict(int)  # (day, exe_name) -> seconds
+        self._seq = 0
+        self._journal = None
+        self._last_flush = time.monotonic()
+        self._last_fsync = time.monotonic()
+
+        self.recover()
+        self.db.attach_timing_accumulator(self)
+
+    def add(self, exe_name, duration, day=None):
+        day = day_key() if day is None else day
+        with self._lock:
+            # Day rollover: push yesterday's totals out before starting a new day
+            if any(pending_day != day for pending_day, _ in self._pending):
+                self.flush()
+
+            self._pending[(day, exe_name)] += duration
+            self._seq += 1
+            self._append_journal([self._seq, day, exe_name, duration])
+
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    @property
+    def seq(self):
+        """Sequence number of the last add(), changes with every buffered timing."""
+        return self._seq
+
+    def pending_for_exe(self, exe_name, day):
+        with self._lock:
+            return self._pending.get((day, exe_name), 0)
+
+    def pending_for_day(self, day):
+        with self._lock:
+            return {
+                exe_name: duration
+                for (pending_day, exe_name), duration in self._pending.items()
+                if pending_day == day
+            }
+
+    def discard(self, exe_name, day):
+        """Forget buffered time for an exe, used when its timing is overwritten."""
+        with self._lock:
+            duration = self._pending.pop((day, exe_name), 0)
+            if duration:
+                # Cancel the journaled adds, else recovery would replay them
+                # on top of the overwritten value
+                self._seq += 1
+                self._append_journal([self._seq, day, exe_name, -duration])
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            deltas = dict(self._pending)
+            self.db.apply_timing_deltas(
+                deltas, journal_seq=self._seq, heartbeat=time.time()
+            )
+            self._pending.clear()
+            self._truncate_journal()
+            logger.info(f"Flushed {len(deltas)} buffered timing entries.")
+
+    def recover(self):
+        """Replay journal entries that did not make it into the DB."""
+        applied_seq = self.db.get_timing_journal_seq()
+        self._seq = applied_seq
+        if self.journal_path is None or not os.path.exists(self.journal_path):
+            return
+
+        deltas = defaultdict(int)
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    seq, day, exe_name, duration = json.loads(line)
+                except ValueError:
+                    break  # Torn last line from a crash
+                if isinstance(day, str):
+                    day = iso_to_day(day)  # Journal written before integer day keys
+                self._seq = max(self._seq, seq)
+                if seq > applied_seq:
+                    deltas[(day, exe_name)] += duration
+
+        if deltas:
+            logger.info(f"Recovering {len(deltas)} timing entries from journal.")
+            self.db.apply_timing_deltas(dict(deltas), journal_seq=self._seq)
+        self._truncate_journal()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _append_journal(self, record):
+        if self.journal_path is None:
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        if time.monotonic() - self._last_fsync >= self.JOURNAL_FSYNC_INTERVAL:
+            os.fsync(self._journal.fileno())
+            self._last_fsync = time.monotonic()
+
+    def _truncate_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_path is not None:
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
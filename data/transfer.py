@@ -0,0 +1,180 @@
+"""
+Streaming export and import of tracker history.
+
+Datasets (timings, sessions, violations) are moved as CSV, JSON Lines or
+Parquet. CSV and JSON Lines are produced chunk by chunk, so exports run in
+constant memory and can be streamed straight into an HTTP response. Parquet
+goes through pandas one batch at a time with pyarrow as the engine, both are
+in requirements.txt.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from log_utils import get_logger
+
+from .orm import DB, EXPORT_BATCH_SIZE, EXPORT_COLUMNS
+
+logger = get_logger("transfer", "tracker.log")
+
+FORMATS = ("csv", "jsonl", "parquet")
+MIMETYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def format_from_path(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    fmt = {"ndjson": "jsonl", "pq": "parquet"}.get(ext, ext)
+    if fmt not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}, use one of {', '.join(FORMATS)}.")
+    return fmt
+
+
+def _require_parquet():
+    try:
+        import pandas  # pylint: disable=import-outside-toplevel
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError(
+            "The parquet format needs pandas and pyarrow, install them with "
+            "`pip install pandas pyarrow`."
+        ) from e
+    return pandas, pyarrow, pq
+
+
+##### Export #####
+def iter_export(db, dataset, fmt):
+    """Yield an export of a dataset as encoded chunks, one per DB batch."""
+    columns = EXPORT_COLUMNS[dataset]
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in db.iter_export_batches(dataset):
+            writer.writerows(batch)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")  # Header of an empty export
+    elif fmt == "jsonl":
+        for batch in db.iter_export_batches(dataset):
+            yield "".join(
+                json.dumps(dict(zip(columns, row))) + "\n" for row in batch
+            ).encode("utf-8")
+    else:
+        raise ValueError(f"'{fmt}' exports are written with export_parquet().")
+
+
+def export_parquet(db, dataset, dest):
+    """Write a dataset to a Parquet file (path or binary file object) batch by batch."""
+    pandas, pyarrow, pq = _require_parquet()
+    columns = list(EXPORT_COLUMNS[dataset])
+    writer = None
+    try:
+        for batch in db.iter_export_batches(dataset):
+            table = pyarrow.Table.from_pandas(
+                pandas.DataFrame.from_records(batch, columns=columns),
+                preserve_index=False,
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(dest, table.schema)
+            writer.write_table(table)
+        if writer is None:
+            # Nothing to export, still write a valid empty file
+            empty = pandas.DataFrame(columns=columns)
+            pq.write_table(pyarrow.Table.from_pandas(empty, preserve_index=False), dest)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_to_file(db, dataset, path, fmt=None):
+    fmt = fmt or format_from_path(path)
+    if fmt == "parquet":
+        export_parquet(db, dataset, path)
+        return
+    with open(path, "wb") as f:
+        for chunk in iter_export(db, dataset, fmt):
+            f.write(chunk)
+
+
+##### Import #####
+def iter_import_batches(source, dataset, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Read rows for a dataset from a path or binary file object and yield them in
+    batches, columns in EXPORT_COLUMNS order. Parquet sources must be seekable.
+    """
+    columns = EXPORT_COLUMNS[dataset]
+    if fmt == "parquet":
+        _, _, pq = _require_parquet()
+        parquet_file = pq.ParquetFile(source)
+        for record_batch in parquet_file.iter_batches(
+            batch_size=batch_size, columns=list(columns)
+        ):
+            yield list(record_batch.to_pandas().itertuples(index=False, name=None))
+        return
+
+    close = isinstance(source, str)
+    f = open(source, "rb") if close else source  # pylint: disable=consider-using-with
+    try:
+        text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+        if fmt == "csv":
+            rows = (
+                tuple(record.get(column) for column in columns)
+                for record in csv.DictReader(text)
+            )
+        elif fmt == "jsonl":
+            rows = (
+                tuple(record.get(column) for column in columns)
+                for record in (json.loads(line) for line in text if line.strip())
+            )
+        else:
+            raise ValueError(f"Unknown format '{fmt}'.")
+
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+        text.detach()
+    finally:
+        if close:
+            f.close()
+
+
+def import_from_file(db, dataset, source, fmt=None):
+    fmt = fmt or format_from_path(source)
+    count = db.import_batches(dataset, iter_import_batches(source, dataset, fmt))
+    logger.info(f"Imported {count} {dataset} rows.")
+    return count
+
+
+if __name__ == "__main__":
+    # python -m data.transfer export timings -o timings.csv
+    # python -m data.transfer import timings timings.csv
+    parser = argparse.ArgumentParser(description="Export or import tracker history.")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("dataset", choices=sorted(EXPORT_COLUMNS))
+    parser.add_argument("path", nargs="?", help="File to import")
+    parser.add_argument("-o", "--output", help="File to export to")
+    parser.add_argument("-f", "--format", choices=FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--db", help="Database path, defaults to the tracker's database")
+    args = parser.parse_args()
+
+    database = DB(args.db) if args.db else DB()
+    if args.action == "export":
+        if not args.output:
+            parser.error("export needs -o/--output")
+        export_to_file(database, args.dataset, args.output, args.format)
+        print(f"Exported {args.dataset} to {args.output}")
+    else:
+        if not args.path:
+            parser.error("import needs a file")
+        imported = import_from_file(database, args.dataset, args.path, args.format)
+        print(f"Imported {imported} {args.dataset} rows from {args.path}")
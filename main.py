@@ -41,6 +41,8 @@ class FixItTray:
 
     def start(self):
         self.tracker.start()
+        app.use_process_snapshots(self.tracker.process_snapshots)
+        app.use_live_events(self.tracker.live_events)
         self.web_app_thread = threading.Thread(
             target=app.app.run,
             kwargs={"port": self.web_app_port, "debug": True, "use_reloader": False},
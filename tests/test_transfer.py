@@ -0,0 +1,62 @@
+import io
+import os
+import tempfile
+import unittest
+
+from data import DB, Compactor
+from data.days import day_key, day_start
+from data.transfer import iter_export, iter_import_batches
+
+DATASETS = ("timings", "sessions", "violations")
+
+
+class ExportImportRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.db = DB(os.path.join(self.tmp.name, "game_tracker.db"))
+        today = day_key()
+        for days_ago in range(0, 400, 5):
+            day = today - days_ago
+            start_ts = day_start(day).timestamp() + 3600
+            self.db.apply_timing_deltas({(day, "game.exe"): 1800})
+            session_id = self.db.open_session("game.exe", 1, start_ts)
+            self.db.close_session(session_id, start_ts + 1800)
+        self.db.import_batches(
+            "violations",
+            [[
+                ("game.exe", day_start(today - days_ago).replace(hour=20).isoformat(), "limit")
+                for days_ago in range(0, 400, 7)
+            ]],
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _state(self):
+        return (
+            self.db.get_daily_timings(),
+            self.db.get_usage_history("month"),
+            {dataset: sorted(self._export_rows(dataset)) for dataset in DATASETS},
+        )
+
+    def _export_rows(self, dataset):
+        return [row for batch in self.db.iter_export_batches(dataset) for row in batch]
+
+    def test_reimport_after_compaction_is_idempotent(self):
+        exports = {
+            dataset: b"".join(iter_export(self.db, dataset, "csv")) for dataset in DATASETS
+        }
+        self.assertGreater(Compactor(self.db, retention_days=180).compact(), 0)
+        before = self._state()
+
+        for dataset, data in exports.items():
+            self.db.import_batches(
+                dataset, iter_import_batches(io.BytesIO(data), dataset, "csv")
+            )
+
+        self.assertEqual(self._state(), before)
+        self.assertEqual(len(before[0]), 80)
+
+
+if __name__ == "__main__":
+    unittest.main()